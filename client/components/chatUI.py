@@ -1,5 +1,5 @@
 import streamlit as st
-from utils.api import ask_question
+from utils.api import ask_question_stream, iter_events
 import requests
 
 def render_chat():
@@ -33,7 +33,7 @@ def render_chat():
 
         with st.spinner("Thinking..."):
             try:
-                response = ask_question(user_input)
+                response = ask_question_stream(user_input, st.session_state.get("workspace", "default").strip() or "default")
             except requests.exceptions.Timeout:
                 st.error("⏱️ Request timed out. The server is taking too long. Please try again.")
                 return
@@ -45,18 +45,32 @@ def render_chat():
                 return
         
         if response.status_code == 200:
-            data = response.json()
-            answer = data.get("response", "No response received.")
-            sources = data.get("sources", [])
-            
+            answer = ""
+            sources = []
             with st.chat_message("assistant", avatar="🤖"):
-                st.markdown(answer)
+                placeholder = st.empty()
+                try:
+                    for event, data in iter_events(response):
+                        if event == "sources":
+                            sources = data.get("sources", [])
+                        elif event == "token":
+                            answer += data.get("content", "")
+                            placeholder.markdown(answer + "▌")
+                        elif event == "error":
+                            st.error(f"⚠️ {data.get('error', 'Unknown error occurred.')}")
+                            break
+                except requests.exceptions.Timeout:
+                    st.error("⏱️ The answer stopped arriving. Please try again.")
+                except requests.exceptions.ConnectionError:
+                    st.error("🔌 Lost connection to the server while answering.")
+                placeholder.markdown(answer or "No response received.")
                 if sources:
                     with st.expander("📄 Source Documents"):
                         for src in sources:
                             st.markdown(f"- `{src}`")
             
-            st.session_state.messages.append({"role": "assistant", "content": answer})
+            if answer:
+                st.session_state.messages.append({"role": "assistant", "content": answer})
         else:
             # Parse JSON error for user-friendly message
             try:
@@ -1,8 +1,39 @@
 import streamlit as st
-from utils.api import upload_pdfs_api, get_documents_api, delete_document_api
+from utils.api import upload_pdfs_api, get_documents_api, delete_document_api, get_job_api
 import requests
+import time
+
+JOB_POLL_INTERVAL = 1   # seconds between /jobs/ polls
+JOB_POLL_TIMEOUT = 600  # give up waiting on the UI side after 10 minutes
+
+def wait_for_job(job_id):
+    """Polls the ingestion job until it finishes and returns its final state."""
+    status_box = st.sidebar.empty()
+    deadline = time.time() + JOB_POLL_TIMEOUT
+    while time.time() < deadline:
+        response = get_job_api(job_id)
+        if response.status_code == 404:
+            # Jobs live in server memory; a restart forgets them
+            status_box.empty()
+            return {"status": "failed", "error": "Upload job no longer exists (server restarted?). Click Refresh to check your documents."}
+        job = response.json()
+        if job.get("status") in ("completed", "failed"):
+            status_box.empty()
+            return job
+        stages = [f"`{name}`: {info['stage']}" for name, info in job.get("files", {}).items()]
+        status_box.caption("⏳ " + " · ".join(stages))
+        time.sleep(JOB_POLL_INTERVAL)
+    status_box.empty()
+    return None
 
 def render_uploader():
+    workspace = st.sidebar.text_input(
+        "🗃️ Workspace", value="default", key="workspace",
+        help="Documents are uploaded to, listed from and searched in this workspace. Ask with * to search every workspace."
+    ).strip() or "default"
+    # Uploads and the document list need one concrete workspace
+    target = "default" if workspace == "*" else workspace
+
     st.sidebar.header("📤 Upload Documents")
     uploaded_files = st.sidebar.file_uploader(
         "Upload files (PDF, Excel, Images)", 
@@ -13,11 +44,23 @@ def render_uploader():
     if st.sidebar.button("Upload to DB", type="primary") and uploaded_files:
         with st.sidebar.spinner("Processing files..."):
             try:
-                response = upload_pdfs_api(uploaded_files)
-                if response.status_code == 200:
-                    st.sidebar.success("✅ Uploaded successfully!")
-                    st.rerun()  # Refresh to show new docs
-                elif response.status_code == 422:
+                response = upload_pdfs_api(uploaded_files, target)
+                if response.status_code == 202:
+                    job = wait_for_job(response.json()["job_id"])
+                    if job is None:
+                        st.sidebar.warning("⏳ Still processing in the background. Click Refresh later.")
+                    elif job["status"] == "completed":
+                        result = job.get("result") or {}
+                        st.sidebar.success(
+                            f"✅ Uploaded successfully! ({result.get('added', 0)} chunks added, "
+                            f"{result.get('skipped', 0)} unchanged, {result.get('removed', 0)} removed)"
+                        )
+                        st.rerun()  # Refresh to show new docs
+                    else:
+                        st.sidebar.error(f"⚠️ {job.get('error') or 'File processing failed'}")
+                elif response.status_code == 429:
+                    st.sidebar.warning("⏳ Server is busy with other uploads. Please try again shortly.")
+                elif response.status_code in (400, 409, 422):
                     try:
                         error_msg = response.json().get("error", "File processing failed")
                     except:
@@ -42,8 +85,10 @@ def render_uploader():
 
     # Fetch documents with error handling
     try:
-        response = get_documents_api()
-        if response.status_code == 200:
+        response = get_documents_api(target)
+        if response.status_code == 404:
+            st.sidebar.info(f"📭 Workspace `{target}` is empty. Upload documents to create it.")
+        elif response.status_code == 200:
             doc_list = response.json().get("documents", [])
             if doc_list:
                 for doc in doc_list:
@@ -51,7 +96,7 @@ def render_uploader():
                     col1.markdown(f"📄 `{doc[:20]}...`" if len(doc) > 20 else f"📄 `{doc}`")
                     if col2.button("🗑️", key=f"del_{doc}", help=f"Delete {doc}"):
                         try:
-                            del_response = delete_document_api(doc)
+                            del_response = delete_document_api(doc, target)
                             if del_response.status_code == 200:
                                 st.sidebar.success(f"Deleted!")
                                 st.rerun()
@@ -1,18 +1,46 @@
+import json
 import requests
+from urllib.parse import quote
 
 from config import API_URL
 TIMEOUT_SHORT = 10  # For quick operations like listing docs
 TIMEOUT_LONG = 60   # For LLM operations that take time
 
-def upload_pdfs_api(files):
+def upload_pdfs_api(files, workspace="default"):
     files_payload = [("files", (f.name, f.read(), "application/pdf")) for f in files]
-    return requests.post(f"{API_URL}/upload_pdfs/", files=files_payload, timeout=TIMEOUT_LONG)
+    return requests.post(f"{API_URL}/upload_pdfs/", files=files_payload, data={"workspace": workspace}, timeout=TIMEOUT_LONG)
 
-def get_documents_api():
-    return requests.get(f"{API_URL}/documents/", timeout=TIMEOUT_SHORT)
+def get_job_api(job_id):
+    return requests.get(f"{API_URL}/jobs/{job_id}", timeout=TIMEOUT_SHORT)
 
-def delete_document_api(filename):
-    return requests.delete(f"{API_URL}/documents/{filename}", timeout=TIMEOUT_SHORT)
+def get_documents_api(workspace="default"):
+    return requests.get(f"{API_URL}/documents/", params={"workspace": workspace}, timeout=TIMEOUT_SHORT)
 
-def ask_question(question):
-    return requests.post(f"{API_URL}/ask/", data={"question": question}, timeout=TIMEOUT_LONG)
\ No newline at end of file
+def delete_document_api(filename, workspace="default"):
+    # Bulk-ingested documents are named by their full path; keep "/" and escape the rest
+    return requests.delete(f"{API_URL}/documents/{quote(filename)}", params={"workspace": workspace}, timeout=TIMEOUT_SHORT)
+
+def ask_question(question, workspace="default"):
+    return requests.post(f"{API_URL}/ask/", data={"question": question, "workspace": workspace}, timeout=TIMEOUT_LONG)
+
+def ask_question_stream(question, workspace="default"):
+    # (connect, read) timeout: the read timeout applies between streamed chunks
+    return requests.post(
+        f"{API_URL}/ask/stream", data={"question": question, "workspace": workspace},
+        stream=True, timeout=(TIMEOUT_SHORT, TIMEOUT_LONG)
+    )
+
+def iter_events(response):
+    """Parses a server-sent events response into (event, data) pairs."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
@@ -0,0 +1,106 @@
+"""
+Embedding throughput and memory per backend: PyTorch sentence-transformers
+vs ONNX Runtime fp32 and int8. Each backend runs in a fresh interpreter so
+its peak RSS is measured on its own.
+
+    python bench_embeddings.py
+    python bench_embeddings.py --texts 5000 --threads 4 --batch-size 64
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+BACKENDS = ["torch", "onnx-fp32", "onnx-int8"]
+
+WORDS = (
+    "invoice customer account delivery quarter auditor ledger balance payment reference "
+    "contract clause warranty shipment supplier order total tax region manager report"
+).split()
+
+
+def make_texts(n, seed=5):
+    rng = random.Random(seed)
+    # Roughly chunk-sized texts (~150 words), the shape ingestion embeds
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(80, 220))) for _ in range(n)]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:  # Windows
+        return float("nan")
+
+
+def worker(backend, args):
+    """Runs in the child process; prints one JSON line of results."""
+    start = time.perf_counter()
+    if backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+        from config import EMBED_MODEL_NAME
+        model = HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME, encode_kwargs={"batch_size": args.batch_size})
+    else:
+        from modules.onnx_embeddings import OnnxEmbeddings, export_onnx
+        model = OnnxEmbeddings(
+            export_onnx(quantize=backend == "onnx-int8"), threads=args.threads, batch_size=args.batch_size
+        )
+    load_s = time.perf_counter() - start
+    model.embed_query("warm up")
+
+    texts = make_texts(args.texts)
+    start = time.perf_counter()
+    model.embed_documents(texts)
+    docs_s = time.perf_counter() - start
+
+    latencies = []
+    for text in texts[:args.queries]:
+        start = time.perf_counter()
+        model.embed_query(text[:200])
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(json.dumps({
+        "load_s": load_s,
+        "texts_per_s": len(texts) / docs_s,
+        "query_p50_ms": latencies[len(latencies) // 2] * 1000,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=0, help="ONNX intra-op threads (0 = config default)")
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        if not args.threads:
+            from config import EMBED_ONNX_THREADS
+            args.threads = EMBED_ONNX_THREADS
+        worker(args.worker, args)
+        return
+
+    print(f"📄 {args.texts} chunk-sized texts, batch size {args.batch_size}")
+    baseline = None
+    for backend in BACKENDS:
+        child = [sys.executable, __file__, "--worker", backend] + sys.argv[1:]
+        out = subprocess.run(child, capture_output=True, text=True)
+        if out.returncode != 0:
+            lines = out.stderr.strip().splitlines()
+            print(f"   {backend:<10} ❌ {lines[-1] if lines else 'failed'}")
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        baseline = baseline or r["texts_per_s"]
+        print(
+            f"   {backend:<10} {r['texts_per_s']:8.1f} texts/s ({r['texts_per_s'] / baseline:4.1f}x)  "
+            f"query p50 {r['query_p50_ms']:6.1f} ms  load {r['load_s']:5.1f}s  peak RSS {r['peak_rss_mb']:7.0f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Query latency of hybrid retrieval (modules/lexical_index.py): vector
+search alone, BM25 alone, and both fused with reciprocal rank fusion, over
+a synthetic corpus where every chunk carries an invoice number and a part
+code. Vector search runs on the memory-mapped index with pre-computed
+query vectors, so the numbers cover search only, not query embedding.
+
+Half the queries ask for an identifier, whose query vector is only loosely
+related to the chunk (as with real embeddings, which don't capture exact
+codes). The other half are topical. hit@k is the share of queries whose
+target chunk is in the top k.
+
+    python bench_hybrid_retrieval.py
+    python bench_hybrid_retrieval.py --sizes 10000,100000 --queries 500 --k 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+
+from modules.lexical_index import LexicalIndex, reciprocal_rank_fusion, doc_key
+from modules.mmap_index import MmapVectorIndex
+
+DIM = 384
+BATCH = 5000
+VOCABULARY = 20000
+
+
+def make_corpus(n, seed=7):
+    rng = np.random.default_rng(seed)
+    topics = rng.standard_normal((max(1, n // 100), DIM)).astype(np.float32)
+    topic_of = rng.integers(0, len(topics), n)
+    vectors = np.empty((n, DIM), dtype=np.float32)
+    for i in range(0, n, 100000):
+        rows = min(100000, n - i)
+        batch = topics[topic_of[i:i + rows]] + 0.6 * rng.standard_normal((rows, DIM)).astype(np.float32)
+        vectors[i:i + rows] = batch / np.linalg.norm(batch, axis=1, keepdims=True)
+    # Zipf-distributed pseudo-words, so a few are in most chunks and most are rare
+    words = np.array([f"w{j}" for j in range(VOCABULARY)])
+    ranks = np.minimum(rng.zipf(1.2, (n, 60)), VOCABULARY) - 1
+    texts = []
+    for i in range(n):
+        words_i = " ".join(words[ranks[i]])
+        texts.append(f"Invoice INV-{i:07d} for part PX-{(i * 7919) % 1000003:07d}. {words_i}")
+    return vectors, texts
+
+
+def percentiles(samples):
+    samples = np.sort(np.asarray(samples) * 1000)
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95)]
+
+
+def run_queries(name, search, queries, targets):
+    samples, hits = [], 0
+    for query, target in zip(queries, targets):
+        start = time.perf_counter()
+        keys = search(query)
+        samples.append(time.perf_counter() - start)
+        hits += target in keys
+    p50, p95 = percentiles(samples)
+    print(f"   {name:<14} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms   {len(queries) / sum(samples):8.1f} q/s   hit@k {hits / len(queries):.3f}")
+
+
+def bench_size(n, args, workdir):
+    print(f"\n📊 {n:,} chunks")
+    vectors, texts = make_corpus(n)
+    ids = [f"c{i}" for i in range(n)]
+    metas = [{"source": f"doc{i // 50}.pdf", "page": i % 50, "chunk": i} for i in range(n)]
+
+    dense_index = MmapVectorIndex(os.path.join(workdir, f"mmap_{n}"))
+    lexical = LexicalIndex(os.path.join(workdir, f"lexical_{n}.sqlite3"))
+    start = time.perf_counter()
+    for i in range(0, n, BATCH):
+        dense_index.append(ids[i:i + BATCH], vectors[i:i + BATCH], texts[i:i + BATCH], metas[i:i + BATCH])
+    dense_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(0, n, BATCH):
+        lexical.upsert(ids[i:i + BATCH], texts[i:i + BATCH], metas[i:i + BATCH])
+    lexical_s = time.perf_counter() - start
+    print(f"   build: vectors {dense_s:6.1f}s, BM25 {lexical_s:6.1f}s ({lexical.stats()['bytes'] / 1e6:.1f} MB)")
+
+    rng = np.random.default_rng(11)
+    targets = rng.integers(0, n, args.queries)
+    queries = []
+    for j, t in enumerate(targets):
+        if j % 2 == 0:
+            # Identifier lookups: the embedding barely reflects the code
+            text = f"What is the total on invoice INV-{t:07d}?"
+            noise = 1.5
+        else:
+            text = " ".join(texts[t].split()[6:12])
+            noise = 0.2
+        vector = vectors[t] + noise * rng.standard_normal(DIM).astype(np.float32)
+        queries.append((text, vector))
+    target_keys = [f"c{t}" for t in targets]
+
+    fetch_k = max(args.k, args.fetch_k)
+
+    def dense(query):
+        return [r[0] for r in dense_index.search(query[1], args.k)]
+
+    def sparse(query):
+        return [r[0] for r in lexical.search(query[0], args.k)]
+
+    def fused(query):
+        # As in modules.lexical_index.hybrid_search: Documents keyed by source/page/text
+        dense_docs = [Document(page_content=t, metadata=m) for _, t, m, _ in dense_index.search(query[1], fetch_k)]
+        sparse_docs = [Document(page_content=t, metadata=m) for _, t, m, _ in lexical.search(query[0], fetch_k)]
+        docs = reciprocal_rank_fusion([[(doc_key(d), d) for d in dense_docs], [(doc_key(d), d) for d in sparse_docs]], args.k)
+        return [f"c{d.metadata['chunk']}" for d in docs]
+
+    run_queries("vector", dense, queries, target_keys)
+    run_queries("bm25", sparse, queries, target_keys)
+    run_queries("fused (RRF)", fused, queries, target_keys)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"🔎 Hybrid retrieval benchmark (k={args.k}, fetch_k={args.fetch_k})")
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in (int(s) for s in args.sizes.split(",")):
+            bench_size(n, args, workdir)
+
+
+if __name__ == "__main__":
+    main()
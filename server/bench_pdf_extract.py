@@ -0,0 +1,73 @@
+"""
+Compares PDF text extraction throughput: the old PyPDFLoader path vs the
+single-pass PyMuPDF extractor in modules/pdf_extract.py.
+
+    python bench_pdf_extract.py                 # synthetic 500-page text PDF
+    python bench_pdf_extract.py --pages 2000
+    python bench_pdf_extract.py my_big_file.pdf
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+from langchain_community.document_loaders import PyPDFLoader
+
+from modules.pdf_extract import extract_pdf
+
+LOREM = (
+    "Invoice INV-{page:05d} issued to customer account {page:07d}. "
+    "The quick brown fox jumps over the lazy dog while the auditor reviews line items, "
+    "tax codes and delivery notes for the quarter. "
+)
+
+
+def make_text_pdf(path, pages):
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        body = "\n".join(LOREM.format(page=n) for _ in range(30))
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), body, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def bench(name, fn, path, repeat):
+    best = float("inf")
+    pages = chars = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        docs = fn(path)
+        best = min(best, time.perf_counter() - start)
+        pages = len(docs)
+        chars = sum(len(d.page_content) for d in docs)
+    print(f"{name:<12} {pages:>6} pages  {chars:>10} chars  {best:8.3f}s  {pages / best:10.1f} pages/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdf", nargs="?", help="PDF to benchmark (default: generate a synthetic one)")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = args.pdf
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        os.close(fd)
+        print(f"📄 Generating {args.pages}-page text PDF...")
+        make_text_pdf(path, args.pages)
+
+    try:
+        old = bench("PyPDFLoader", lambda p: PyPDFLoader(p).load(), path, args.repeat)
+        new = bench("PyMuPDF", extract_pdf, path, args.repeat)
+        print(f"⚡ Speed-up: {old / new:.1f}x")
+    finally:
+        if args.pdf is None:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Query latency of the memory-mapped read index (modules/mmap_index.py),
+exact and approximate, against a Chroma collection holding the same
+synthetic vectors. Both sides get pre-computed query vectors, so the
+numbers cover search only, not query embedding.
+
+    python bench_read_index.py
+    python bench_read_index.py --sizes 10000,100000 --queries 500
+    python bench_read_index.py --sizes 1000000 --skip-chroma
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from modules.mmap_index import MmapVectorIndex
+
+DIM = 384
+BATCH = 5000
+
+
+def make_vectors(n, seed=7):
+    """Clustered unit vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 100), DIM)).astype(np.float32)
+    vectors = np.empty((n, DIM), dtype=np.float32)
+    # Filled in batches so 1M rows don't need several full-size temporaries
+    for i in range(0, n, 100000):
+        rows = min(100000, n - i)
+        batch = centers[rng.integers(0, len(centers), rows)] + 0.6 * rng.standard_normal((rows, DIM)).astype(np.float32)
+        vectors[i:i + rows] = batch / np.linalg.norm(batch, axis=1, keepdims=True)
+    return vectors
+
+
+def percentiles(samples):
+    samples = np.sort(np.asarray(samples) * 1000)
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.95)]
+
+
+def run_queries(name, search, queries, reference=None):
+    results, samples = [], []
+    for q in queries:
+        start = time.perf_counter()
+        results.append(search(q))
+        samples.append(time.perf_counter() - start)
+    p50, p95 = percentiles(samples)
+    line = f"   {name:<22} p50 {p50:8.2f} ms   p95 {p95:8.2f} ms   {len(queries) / sum(samples):8.1f} q/s"
+    if reference is not None:
+        recall = np.mean([len(set(r) & set(e)) / len(e) for r, e in zip(results, reference)])
+        line += f"   recall@k {recall:.3f}"
+    print(line)
+    return results
+
+
+def bench_size(n, args, workdir):
+    print(f"\n📊 {n:,} chunks x {DIM} dims")
+    vectors = make_vectors(n)
+    ids = [f"c{i}" for i in range(n)]
+    rng = np.random.default_rng(11)
+    queries = vectors[rng.integers(0, n, args.queries)] + 0.2 * rng.standard_normal((args.queries, DIM)).astype(np.float32)
+
+    index = MmapVectorIndex(os.path.join(workdir, f"mmap_{n}"), dtype=args.dtype)
+    start = time.perf_counter()
+    for i in range(0, n, BATCH):
+        index.append(ids[i:i + BATCH], vectors[i:i + BATCH], ids[i:i + BATCH], [{"source": "bench"}] * len(ids[i:i + BATCH]))
+    print(f"   mmap build {time.perf_counter() - start:8.1f}s   {index.stats()['bytes'] / 1e6:8.1f} MB on disk")
+
+    exact = run_queries("mmap exact", lambda q: [r[0] for r in index.search(q, args.k, mode="exact")], queries)
+    start = time.perf_counter()
+    lists = index.train()
+    print(f"   mmap train {time.perf_counter() - start:8.1f}s   {lists} lists")
+    run_queries(
+        f"mmap approx (nprobe {args.nprobe})",
+        lambda q: [r[0] for r in index.search(q, args.k, mode="approx", nprobe=args.nprobe)],
+        queries, exact,
+    )
+
+    if args.skip_chroma:
+        return
+    import chromadb
+    client = chromadb.PersistentClient(path=os.path.join(workdir, f"chroma_{n}"))
+    collection = client.create_collection("bench")
+    start = time.perf_counter()
+    for i in range(0, n, BATCH):
+        collection.add(ids=ids[i:i + BATCH], embeddings=vectors[i:i + BATCH].tolist(), documents=ids[i:i + BATCH])
+    print(f"   chroma build {time.perf_counter() - start:6.1f}s")
+    run_queries(
+        "chroma query",
+        lambda q: collection.query(query_embeddings=[q.tolist()], n_results=args.k)["ids"][0],
+        queries, exact,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--dtype", default="float32", choices=["float16", "float32"])
+    parser.add_argument("--skip-chroma", action="store_true", help="Chroma ingest at 1M takes a long time")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_read_index_")
+    try:
+        for n in (int(s) for s in args.sizes.split(",")):
+            bench_size(n, args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
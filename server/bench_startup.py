@@ -0,0 +1,82 @@
+"""
+Reports server cold-start cost: how long each module takes to import in a
+fresh interpreter, the slowest imports pulled in by `main`, and how long
+each heavy component takes to initialize on first use.
+
+    python bench_startup.py
+    python bench_startup.py --top 30
+"""
+import argparse
+import subprocess
+import sys
+
+MODULES = [
+    "config",
+    "logger",
+    "modules.metrics",
+    "modules.resources",
+    "modules.catalog",
+    "modules.answer_cache",
+    "modules.llm",
+    "modules.load_vectorstore",
+    "main",
+]
+
+# Each snippet runs in its own fresh interpreter and prints elapsed seconds
+INIT_STEPS = {
+    "embed model load": "from modules.resources import registry; t=time.perf_counter(); registry.embed_model()",
+    "embed first query": "from modules.resources import registry; e=registry.embed_model(); t=time.perf_counter(); getattr(e, 'underlying', e).embed_query('warm up')",
+    "chroma open": "from modules.resources import registry; registry.embed_model(); t=time.perf_counter(); registry.vectorstore()",
+    "llm client init": "from modules.resources import registry; t=time.perf_counter(); registry.llm()",
+    "ocr engine init": "from modules.load_vectorstore import get_ocr_engine; t=time.perf_counter(); get_ocr_engine()",
+    "pandas import (excel)": "t=time.perf_counter(); import pandas",
+    "pymupdf import (pdf)": "t=time.perf_counter(); import fitz",
+}
+
+
+def run(code):
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if out.returncode != 0:
+        return None, out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed"
+    return float(out.stdout.strip().splitlines()[-1]), None
+
+
+def import_time(module):
+    return run(f"import time; t=time.perf_counter(); import {module}; print(time.perf_counter()-t)")
+
+
+def slowest_imports(module, top):
+    """Parses `python -X importtime` output for the largest self-times."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    print("📦 Import time per module (fresh interpreter, includes dependencies)")
+    for module in MODULES:
+        seconds, error = import_time(module)
+        print(f"   {module:<28} {seconds * 1000:9.1f} ms" if error is None else f"   {module:<28} ❌ {error}")
+
+    print(f"\n🐢 Slowest imports under `main` (self time)")
+    for self_us, cumulative_us, name in slowest_imports("main", args.top):
+        print(f"   {name:<40} self {self_us / 1000:8.1f} ms   cumulative {cumulative_us / 1000:8.1f} ms")
+
+    print("\n⚙️ First-use initialization (paid lazily / during background warm-up)")
+    for label, code in INIT_STEPS.items():
+        seconds, error = run(f"import time; {code}; print(time.perf_counter()-t)")
+        print(f"   {label:<28} {seconds * 1000:9.1f} ms" if error is None else f"   {label:<28} ❌ {error}")
+
+
+if __name__ == "__main__":
+    main()
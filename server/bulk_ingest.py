@@ -0,0 +1,336 @@
+"""
+Bulk ingestion of a whole directory tree into a workspace, for corpora too
+large to push through the upload form. Files are extracted and chunked on
+a pool of worker processes (one file per worker at a time), the new chunks
+of many files are embedded together in large batches, and the vectors are
+written straight into the Chroma collection and its sidecar indexes.
+
+Files are indexed in place, not copied: a file's catalog name and source
+are both its absolute path, so files from different roots never collide
+with each other or with uploads. Deleting such a document from the app
+removes it from the index only.
+
+The API server must be stopped while this runs. Chroma's persistent store
+is not safe to write from two processes, and a running server would
+neither see the new vectors nor drop its cached answers. The server holds
+a shared lock on the store (modules/store_lock.py) and this script takes
+it exclusively, so either one refuses to start while the other runs.
+
+A manifest records every finished file with its size and mtime, so an
+interrupted run resumes where it stopped and finished files are not read
+again. Chunk ids are deterministic, so a file whose chunks were half
+written when the run died is written again without duplicates.
+
+    python bulk_ingest.py /data/contracts
+    python bulk_ingest.py /data/contracts --workspace legal --workers 8 --embed-batch 2048
+    python bulk_ingest.py /data/contracts --retry-failed
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+# Heavy modules (config included) are imported inside functions: worker
+# processes re-import this file before their initializer sets their limits
+
+SUPPORTED_EXTENSIONS = {".pdf", ".xlsx", ".xls", ".png", ".jpg", ".jpeg"}
+HASH_CHUNK = 1024 * 1024
+# Files that finished for good; "empty" and "failed" are retried with --retry-failed
+FINISHED = ("ingested", "unchanged")
+
+
+class Manifest:
+    """SQLite checkpoint of the files a bulk run has finished, per workspace."""
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                workspace TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER,
+                mtime_ns INTEGER,
+                status TEXT NOT NULL,
+                pages INTEGER,
+                chunks INTEGER,
+                error TEXT,
+                finished_at REAL NOT NULL,
+                PRIMARY KEY (workspace, path)
+            );
+        """)
+        self._db.commit()
+
+    def finished(self, workspace, statuses):
+        """{path: (size, mtime_ns)} of files with one of `statuses`."""
+        marks = ",".join("?" * len(statuses))
+        rows = self._db.execute(
+            f"SELECT path, size, mtime_ns FROM files WHERE workspace=? AND status IN ({marks})",
+            (workspace, *statuses)
+        )
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+    def mark(self, workspace, path, size, mtime_ns, status, pages=0, chunks=0, error=None):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO files (workspace, path, size, mtime_ns, status, pages, chunks, error, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (workspace, path, size, mtime_ns, status, pages, chunks, error, time.time())
+            )
+
+
+def walk_corpus(root):
+    """Supported files under `root` in a stable order, skipping hidden files and directories."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in sorted(filenames):
+            if not filename.startswith(".") and Path(filename).suffix.lower() in SUPPORTED_EXTENSIONS:
+                yield Path(dirpath) / filename
+
+
+def file_digest(path):
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            hasher.update(chunk)
+            size += len(chunk)
+    return hasher.hexdigest(), size
+
+
+def _init_worker():
+    # Files already run in parallel; nested OCR and chunking pools would only oversubscribe the cores
+    os.environ["OCR_WORKERS"] = "1"
+    os.environ["CHUNK_WORKERS"] = "1"
+
+
+def extract_file(path, name, known_hash):
+    """
+    Worker task: extracts and chunks one file. Returns early when the file's
+    hash matches `known_hash` (the catalog already holds exactly this file).
+    """
+    from modules.load_vectorstore import process_file, chunk_ids, page_count
+    from modules.chunking import split_documents
+
+    sha256, size = file_digest(path)
+    result = {"name": name, "sha256": sha256, "size": size}
+    if sha256 == known_hash:
+        return {**result, "status": "unchanged"}
+    documents = list(process_file(Path(path)))
+    if not documents:
+        return {**result, "status": "empty"}
+    chunks = split_documents(documents)
+    for chunk in chunks:
+        chunk.metadata["file_hash"] = sha256
+    return {**result, "status": "chunked", "pages": page_count(documents), "chunks": chunks, "ids": chunk_ids(name, chunks)}
+
+
+class Throughput:
+    """Running files/pages/chunks per second, printed every `every` seconds."""
+
+    def __init__(self, total, every):
+        self.total = total
+        self.every = every
+        self.start = self._last = time.perf_counter()
+        self.files = self.pages = self.chunks = self.embedded = 0
+
+    def add(self, files=0, pages=0, chunks=0, embedded=0):
+        self.files += files
+        self.pages += pages
+        self.chunks += chunks
+        self.embedded += embedded
+
+    def line(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return (
+            f"{self.files}/{self.total} files in {elapsed:.0f}s: {self.files / elapsed:.2f} files/s, "
+            f"{self.pages / elapsed:.1f} pages/s, {self.chunks / elapsed:.1f} chunks/s "
+            f"({self.embedded} chunks embedded)"
+        )
+
+    def maybe_print(self):
+        if time.perf_counter() - self._last >= self.every:
+            self._last = time.perf_counter()
+            print(f"⏱️ {self.line()}", flush=True)
+
+
+def run(args):
+    from modules.store_lock import lock_store, StoreLockedError
+
+    root = Path(args.root).resolve()
+    if not root.is_dir():
+        print(f"❌ Not a directory: {root}")
+        return 1
+    try:
+        store_lock = lock_store(exclusive=True)
+    except StoreLockedError as e:
+        print(f"❌ {e} Stop the server before bulk ingestion, then start it again afterwards.")
+        return 1
+    try:
+        return _ingest(args, root)
+    finally:
+        store_lock.close()
+
+
+def _ingest(args, root):
+    from config import WRITE_BATCH_SIZE
+    from modules.resources import registry
+    from modules.catalog import document_name
+    from modules.load_vectorstore import diff_chunks, write_chunks
+    from modules.workspaces import normalize_workspace, create_workspace, workspace_paths
+
+    workspace = normalize_workspace(args.workspace)
+    create_workspace(workspace)
+    write_batch = args.write_batch or WRITE_BATCH_SIZE
+
+    manifest = Manifest(args.manifest)
+    statuses = FINISHED if args.retry_failed else FINISHED + ("empty", "failed")
+    finished = manifest.finished(workspace, statuses)
+    todo = []
+    upload_dir = workspace_paths(workspace).upload_dir
+    for path in walk_corpus(root):
+        name = document_name(str(path), upload_dir)
+        stat = path.stat()
+        if finished.get(name) != (stat.st_size, stat.st_mtime_ns):
+            todo.append((path, name, stat))
+    print(f"📂 {root}: {len(todo)} files to ingest into '{workspace}' ({len(finished)} already finished)")
+    if not todo:
+        return 0
+
+    collection = registry.collection(workspace)
+    catalog = registry.catalog(workspace)
+    embed_model = registry.embed_model()
+    progress = Throughput(len(todo), args.report_every)
+    stats = {path: stat for path, _, stat in todo}
+    buffer = []  # chunked files whose new chunks wait for the next embedding batch
+    failed = 0
+
+    def mark(item, status, pages=0, chunks=0, error=None):
+        stat = stats[item["path"]]
+        manifest.mark(workspace, item["name"], stat.st_size, stat.st_mtime_ns, status, pages, chunks, error)
+
+    def flush():
+        if not buffer:
+            return
+        new_chunks = [c for item in buffer for c in item["new_chunks"]]
+        new_ids = [i for item in buffer for i in item["new_ids"]]
+        embeddings = []
+        texts = [c.page_content for c in new_chunks]
+        for i in range(0, len(texts), args.embed_batch):
+            embeddings.extend(embed_model.embed_documents(texts[i:i + args.embed_batch]))
+        # Store first, catalog and manifest after: a crash in between only means the file is redone
+        write_chunks(
+            workspace, new_ids, embeddings, new_chunks,
+            [i for item in buffer for i in item["kept_ids"]],
+            [m for item in buffer for m in item["kept_metadatas"]],
+            [i for item in buffer for i in item["stale_ids"]],
+            batch_size=write_batch,
+        )
+        for item in buffer:
+            catalog.upsert_document(item["name"], str(item["path"]), item["sha256"], item["size"], item["pages"], item["ids"])
+            mark(item, "ingested", item["pages"], len(item["ids"]))
+            progress.add(files=1, pages=item["pages"], chunks=len(item["ids"]), embedded=len(item["new_ids"]))
+        buffer.clear()
+
+    def handle(path, result):
+        nonlocal failed
+        item = {**result, "path": path}
+        if item["status"] == "unchanged":
+            mark(item, "unchanged")
+            progress.add(files=1)
+            return
+        if item["status"] == "empty":
+            print(f"⚠️ No content extracted from {item['name']}")
+            mark(item, "empty")
+            failed += 1
+            progress.add(files=1)
+            return
+        if catalog.get(item["name"]):
+            existing_ids = set(catalog.chunk_ids(item["name"]))
+        else:
+            existing_ids = set(collection.get(where={"source": str(path)}, include=[])["ids"])
+        new_chunks, new_ids, kept_ids, kept_metadatas, stale_ids = diff_chunks(item["ids"], item.pop("chunks"), existing_ids)
+        item.update(
+            new_chunks=new_chunks, new_ids=new_ids,
+            kept_ids=kept_ids, kept_metadatas=kept_metadatas, stale_ids=stale_ids,
+        )
+        buffer.append(item)
+        if sum(len(b["new_ids"]) for b in buffer) >= args.embed_batch:
+            flush()
+
+    context = multiprocessing.get_context("spawn")
+    max_inflight = args.workers * 2
+    queue = iter(todo)
+    pending = {}
+    interrupted = False
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context, initializer=_init_worker) as pool:
+        try:
+            while True:
+                for path, name, _ in queue:
+                    entry = catalog.get(name)
+                    if entry and Path(entry["source"]).resolve() != path:
+                        # Never diff against (and delete the chunks of) a different file
+                        print(f"⚠️ Skipping {path}: '{name}' is already indexed from {entry['source']}")
+                        stat = stats[path]
+                        manifest.mark(workspace, name, stat.st_size, stat.st_mtime_ns, "failed", error="name in use")
+                        failed += 1
+                        progress.add(files=1)
+                        continue
+                    future = pool.submit(extract_file, str(path), name, entry["file_hash"] if entry else None)
+                    pending[future] = (path, name)
+                    if len(pending) >= max_inflight:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, name = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"❌ {name}: {e}")
+                        stat = stats[path]
+                        manifest.mark(workspace, name, stat.st_size, stat.st_mtime_ns, "failed", error=str(e))
+                        failed += 1
+                        progress.add(files=1)
+                        continue
+                    # Store errors are not per-file: they stop the run, and a rerun resumes it
+                    handle(path, result)
+                progress.maybe_print()
+        except KeyboardInterrupt:
+            interrupted = True
+            print("\n🛑 Interrupted; writing the files already chunked, then stopping")
+            pool.shutdown(wait=False, cancel_futures=True)
+        flush()
+
+    print(f"{'🛑' if interrupted else '✅'} {progress.line()}")
+    if failed:
+        print(f"⚠️ {failed} files failed or had no content (rerun with --retry-failed to try them again)")
+    if interrupted:
+        print("   Run the same command again to resume.")
+        return 130
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a directory tree into a workspace.")
+    parser.add_argument("root", help="directory to ingest; searched recursively")
+    parser.add_argument("--workspace", default="default")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="extraction processes (default: CPU count - 1)")
+    parser.add_argument("--embed-batch", type=int, default=1024, help="chunks embedded per encoder call")
+    parser.add_argument("--write-batch", type=int, default=0, help="chunks per collection upsert (default: WRITE_BATCH_SIZE)")
+    parser.add_argument("--manifest", default="./bulk_ingest.sqlite3", help="checkpoint file used to resume")
+    parser.add_argument("--retry-failed", action="store_true", help="retry files that failed or had no content")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between throughput lines")
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
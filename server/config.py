@@ -0,0 +1,145 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Storage
+UPLOAD_DIR = "./uploaded_pdfs"
+PERSIST_DIR = "./chroma_db"
+COLLECTION_NAME = "rag_app"
+# Held shared by API server processes and exclusively by bulk_ingest.py
+STORE_LOCK_PATH = os.getenv("STORE_LOCK_PATH", os.path.join(PERSIST_DIR, ".store.lock"))
+
+# Workspaces: the default one uses the paths above, every other one gets its
+# own collection ("rag_app-<name>") and a directory under WORKSPACES_DIR
+DEFAULT_WORKSPACE = "default"
+WORKSPACES_DIR = os.getenv("WORKSPACES_DIR", "./workspaces")
+# Threads searching workspaces in parallel for cross-workspace questions
+WORKSPACE_FANOUT_WORKERS = int(os.getenv("WORKSPACE_FANOUT_WORKERS", "4"))
+
+# Models
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+# "torch" runs sentence-transformers; "onnx" runs the same model in ONNX Runtime
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR", "./onnx_models")
+# Dynamic int8 quantization of the ONNX weights
+EMBED_ONNX_QUANTIZE = os.getenv("EMBED_ONNX_QUANTIZE", "true").lower() == "true"
+EMBED_ONNX_THREADS = int(os.getenv("EMBED_ONNX_THREADS", str(os.cpu_count() or 1)))
+EMBED_ONNX_BATCH_SIZE = int(os.getenv("EMBED_ONNX_BATCH_SIZE", "32"))
+LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME", "llama-3.3-70b-versatile")
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+# "groq" for the pooled API client, "langchain" for ChatGroq, "stub" for the offline streaming stub
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+STUB_LLM_TOKEN_DELAY = float(os.getenv("STUB_LLM_TOKEN_DELAY", "0.02"))
+
+# Pooled LLM client (any OpenAI-compatible chat completions API; see stub_llm_server.py)
+LLM_API_BASE = os.getenv("LLM_API_BASE", "https://api.groq.com/openai/v1")
+# Smaller model used when the primary errors or misses LLM_FALLBACK_AFTER; empty disables
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "llama-3.1-8b-instant")
+# Total seconds one question may spend on LLM calls, fallback included
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "45"))
+LLM_FALLBACK_AFTER = float(os.getenv("LLM_FALLBACK_AFTER", "15"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+# Hedge delay until enough latencies are seen to use the model's p95; never hedge sooner than the minimum
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "4"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "20"))
+
+# Retrieval
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "6"))
+
+# /ask/ concurrency
+ASK_WORKERS = int(os.getenv("ASK_WORKERS", "8"))
+# Questions admitted but not finished; beyond this /ask/ answers 429
+ASK_QUEUE_LIMIT = int(os.getenv("ASK_QUEUE_LIMIT", "32"))
+ASK_RETRY_AFTER = int(os.getenv("ASK_RETRY_AFTER", "2"))
+ASK_EMBED_CONCURRENCY = int(os.getenv("ASK_EMBED_CONCURRENCY", "2"))
+ASK_LLM_CONCURRENCY = int(os.getenv("ASK_LLM_CONCURRENCY", "4"))
+
+# /ask/batch
+ASK_BATCH_MAX_QUESTIONS = int(os.getenv("ASK_BATCH_MAX_QUESTIONS", "500"))
+ASK_BATCH_PARALLELISM = int(os.getenv("ASK_BATCH_PARALLELISM", "4"))
+# LLM calls started per second across all batches; 0 disables the limit
+ASK_BATCH_RATE_LIMIT = float(os.getenv("ASK_BATCH_RATE_LIMIT", "0"))
+
+# Context packing (between retrieval and the prompt)
+CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING_ENABLED", "true").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# A chunk is dropped when this share of its word 3-grams already appear in a higher-ranked one
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+CONTEXT_MMR_ENABLED = os.getenv("CONTEXT_MMR_ENABLED", "false").lower() == "true"
+# 1.0 orders purely by relevance, lower values favour diversity
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+
+# Ingestion jobs
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_QUEUE_LIMIT = int(os.getenv("INGEST_QUEUE_LIMIT", "16"))
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "200"))
+
+# OCR
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+# Pages with fewer extractable characters than this are sent to OCR
+OCR_MIN_PAGE_CHARS = int(os.getenv("OCR_MIN_PAGE_CHARS", "20"))
+
+# Uploads
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_MB", "100")) * 1024 * 1024
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_MB", "500")) * 1024 * 1024
+
+# Embedding cache
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./embed_cache.sqlite3")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float16")
+
+# Answer cache
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+# Cosine similarity for semantic matches; 0 disables semantic matching
+ANSWER_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("ANSWER_CACHE_SEMANTIC_THRESHOLD", "0"))
+
+# Document catalog (sidecar next to chroma_db)
+CATALOG_PATH = os.getenv("CATALOG_PATH", "./doc_catalog.sqlite3")
+
+# Ingestion pipeline
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "256"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+# Pages (or spreadsheet row groups) of one file that move through the pipeline together
+INGEST_PART_DOCS = int(os.getenv("INGEST_PART_DOCS", "64"))
+
+# Spreadsheets
+SHEET_ROWS_PER_DOC = int(os.getenv("SHEET_ROWS_PER_DOC", "50"))
+
+# Chunking
+# "tokens" sizes chunks with the embedding model's tokenizer; "chars" uses character counts
+CHUNK_SIZE_MODE = os.getenv("CHUNK_SIZE_MODE", "tokens")
+# all-MiniLM-L6-v2 truncates at 256 word pieces, so token chunks stay just under that
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "240" if CHUNK_SIZE_MODE == "tokens" else "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "24" if CHUNK_SIZE_MODE == "tokens" else "100"))
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+# Documents with fewer pages than this are split inline; pool overhead isn't worth it
+CHUNK_PARALLEL_MIN_PAGES = int(os.getenv("CHUNK_PARALLEL_MIN_PAGES", "16"))
+
+# Memory-mapped read index for the query path (exported from the Chroma collection)
+MMAP_INDEX_ENABLED = os.getenv("MMAP_INDEX_ENABLED", "false").lower() == "true"
+MMAP_INDEX_DIR = os.getenv("MMAP_INDEX_DIR", "./mmap_index")
+# float16 halves disk and page-cache use, but the exact scan pays a float32 conversion per row
+MMAP_INDEX_DTYPE = os.getenv("MMAP_INDEX_DTYPE", "float32")
+# "exact" scores every row; "approx" scores only the MMAP_INDEX_NPROBE nearest clusters
+MMAP_INDEX_MODE = os.getenv("MMAP_INDEX_MODE", "exact")
+MMAP_INDEX_NPROBE = int(os.getenv("MMAP_INDEX_NPROBE", "8"))
+# Approx mode clusters the index at startup once it holds this many rows
+MMAP_INDEX_TRAIN_MIN_ROWS = int(os.getenv("MMAP_INDEX_TRAIN_MIN_ROWS", "10000"))
+
+# Hybrid retrieval: BM25 over chunk text fused with vector search
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "./lexical_index.sqlite3")
+# Query words found in more than this share of chunks are skipped once the index is large
+LEXICAL_MAX_DF = float(os.getenv("LEXICAL_MAX_DF", "0.2"))
+# Candidates each side contributes before fusion down to RETRIEVER_K
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))
+# Reciprocal rank fusion constant; larger values flatten the gap between ranks
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
@@ -1,27 +1,127 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOG_FILE = os.getenv("LOG_FILE", "./ragbot.log")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_MB", "20")) * 1024 * 1024
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Per-subsystem overrides, e.g. "ragbot.ingest=DEBUG,ragbot.http=WARNING"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+# Correlation ids, set by the HTTP middleware and the ingestion job runner
+request_id_var = contextvars.ContextVar("request_id", default=None)
+job_id_var = contextvars.ContextVar("job_id", default=None)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps records with the current request/job id. Runs on the caller's thread."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        record.job_id = job_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key in ("request_id", "job_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare() folds the traceback into the message and drops
+    exc_info. This keeps the message as logged and hands the traceback on
+    as exc_text, so the file gets a separate "exc" field and the console
+    formatter still prints it.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+_listener = None
 
 
 def setup_logger(name="ragbot"):
+    """
+    Routes every `ragbot.*` logger through one in-memory queue. A background
+    listener thread drains it to the console and to a size-rotated JSON-lines
+    file, so request and ingestion threads never block on disk I/O.
+    """
+    global _listener
 
     logger=logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    if _listener is not None:
+        return logger
+
+    logger.setLevel(LOG_LEVEL.upper())
+    logger.propagate = False
+    for spec in filter(None, (part.strip() for part in LOG_LEVELS.split(","))):
+        subsystem, _, level = spec.partition("=")
+        logging.getLogger(subsystem.strip()).setLevel(level.strip().upper())
 
     # Console handler
     ch=logging.StreamHandler()
-    ch.setLevel(logging.DEBUG)
+    ch.setFormatter(logging.Formatter("[%(asctime)s] [%(levelname)s] [%(name)s] -  %(message)s "))
 
-    # formatter
+    # Structured file handler with size-based rotation
+    fh=logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    fh.setFormatter(JsonFormatter())
 
-    formatter=logging.Formatter("[%(asctime)s] [%(levelname)s] -  %(message)s ")
-    ch.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    qh = StructuredQueueHandler(log_queue)
+    qh.addFilter(ContextFilter())
+    logger.handlers = [qh]
 
-    if not logger.hasHandlers():
-        logger.addHandler(ch)
+    _listener = logging.handlers.QueueListener(log_queue, ch, fh, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
 
     return logger
 
 
+def stop_logging():
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
+def get_logger(subsystem):
+    """Logger for one subsystem (e.g. "ingest"); level is tunable via LOG_LEVELS."""
+    return logging.getLogger(f"ragbot.{subsystem}")
 
 
-logger=setup_logger()
\ No newline at end of file
+logger=setup_logger()
@@ -1,14 +1,79 @@
-from fastapi import FastAPI,UploadFile,File,Form,Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI,UploadFile,File,Form,Request,Body
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 from typing import List
-from modules.load_vectorstore import load_vectorstore
-from modules.llm import get_llm_chain
-from modules.query_handlers import query_chain
-from logger import logger
+from modules.load_vectorstore import ingest_files
+from modules.pdf_handlers import (
+    stage_uploaded_files, saved_uploads, publish_uploads, discard_uploads, upload_name, UploadTooLargeError
+)
+from modules.jobs import job_manager, QueueFullError, DocumentBusyError
+from modules.ocr import shutdown_ocr_pool
+from modules.chunking import shutdown_chunk_pool
+from modules.llm import get_llm_chain, get_streaming_chain
+from modules.query_handlers import query_chain, stream_query_chain
+from modules.batch_query import answer_batch
+from modules.resources import registry
+from modules.answer_cache import answer_cache, normalize_question, workspace_scope
+from modules.query_gate import query_gate, QueryOverloadedError
+from modules.retrieval import get_retriever, shutdown_fanout_pool
+from modules.workspaces import (
+    InvalidWorkspaceError, normalize_workspace, resolve_workspaces, workspace_exists, workspace_paths,
+    create_workspace, list_workspaces, workspace_stats
+)
+from modules.metrics import render_metrics, HTTP_LATENCY, HTTP_REQUESTS
+from modules.store_lock import lock_store
+from config import PERSIST_DIR, DEFAULT_WORKSPACE, ASK_RETRY_AFTER, ASK_BATCH_MAX_QUESTIONS
+from logger import logger, get_logger, request_id_var
+from functools import partial
+import asyncio
+import json
 import os
+import time
+import uuid
+
+http_logger=get_logger("http")
+
+def warm_up():
+    registry.warm_up()
+    for workspace in list_workspaces():
+        try:
+            registry.catalog(workspace).bootstrap(registry.collection(workspace),workspace_paths(workspace).upload_dir)
+        except Exception:
+            logger.exception(f"Catalog bootstrap failed ({workspace})")
+        try:
+            read_index=registry.read_index(workspace)
+            if read_index is not None:
+                read_index.bootstrap(registry.collection(workspace))
+        except Exception:
+            logger.exception(f"Read index bootstrap failed ({workspace})")
+        try:
+            lexical_index=registry.lexical_index(workspace)
+            if lexical_index is not None:
+                lexical_index.bootstrap(registry.collection(workspace))
+        except Exception:
+            logger.exception(f"Lexical index bootstrap failed ({workspace})")
+
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+    # Refuses to start while bulk_ingest.py is writing to the store
+    store_lock=lock_store(exclusive=False)
+    registry.timings["app_startup"]=round(time.time()-registry.started_at,3)
+    # Warm up in the background so /test and /ready answer while the model loads
+    warmup_task=asyncio.create_task(asyncio.to_thread(warm_up))
+    yield
+    if not warmup_task.done():
+        warmup_task.cancel()
+    job_manager.shutdown()
+    query_gate.shutdown()
+    shutdown_fanout_pool()
+    shutdown_ocr_pool()
+    shutdown_chunk_pool()
+    registry.shutdown_llm()
+    store_lock.close()
 
-app=FastAPI(title="RagBot2.0")
+app=FastAPI(title="RagBot2.0",lifespan=lifespan)
 
 # allow frontend
 
@@ -20,6 +85,24 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+@app.middleware("http")
+async def metrics_middleware(request:Request,call_next):
+    start=time.perf_counter()
+    status=500
+    try:
+        response=await call_next(request)
+        status=response.status_code
+        return response
+    finally:
+        # Label by route template (/jobs/{job_id}), not raw path, to keep cardinality bounded
+        route=request.scope.get("route")
+        path=getattr(route,"path","unmatched")
+        elapsed=time.perf_counter()-start
+        HTTP_LATENCY.observe(elapsed,method=request.method,route=path)
+        HTTP_REQUESTS.inc(method=request.method,route=path,status=status)
+        if path!="/metrics":
+            http_logger.info(f"{request.method} {path} {status} {elapsed*1000:.1f}ms")
+
 @app.middleware("http")
 async def catch_exception_middleware(request:Request,call_next):
     try:
@@ -27,39 +110,138 @@ async def catch_exception_middleware(request:Request,call_next):
     except Exception as exc:
         logger.exception("UNHANDLED EXCEPTION")
         return JSONResponse(status_code=500,content={"error":str(exc)})
+
+@app.middleware("http")
+async def request_id_middleware(request:Request,call_next):
+    # Outermost middleware: every log line for this request carries its id
+    request_id=request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token=request_id_var.set(request_id)
+    try:
+        response=await call_next(request)
+        response.headers["X-Request-ID"]=request_id
+        return response
+    finally:
+        request_id_var.reset(token)
     
+def invalid_workspace_response(error):
+    return JSONResponse(status_code=400, content={"error": str(error), "code": "INVALID_WORKSPACE"})
+
+def workspace_not_found_response(workspace):
+    return JSONResponse(
+        status_code=404,
+        content={"error": f"Workspace '{workspace}' does not exist. Upload documents to it first.", "code": "WORKSPACE_NOT_FOUND"}
+    )
+
+def existing_workspace(value):
+    """Returns (workspace, None) for an existing workspace, else (None, error response)."""
+    try:
+        workspace = normalize_workspace(value)
+    except InvalidWorkspaceError as e:
+        return None, invalid_workspace_response(e)
+    if not workspace_exists(workspace):
+        return None, workspace_not_found_response(workspace)
+    return workspace, None
+
 @app.post("/upload_pdfs/")
-async def upload_pdfs(files:List[UploadFile]=File(...)):
+async def upload_pdfs(files:List[UploadFile]=File(...),workspace:str=Form(DEFAULT_WORKSPACE)):
     try:
-        logger.info(f"recieved {len(files)} files")
-        result = load_vectorstore(files)
-        
-        if result.get("status") == "success":
-            logger.info("documents added to chroma")
-            return {"message": f"Successfully processed {result.get('processed')} files."}
-        else:
-            failed_files = ", ".join(result.get("failed", []))
-            logger.error(f"Ingestion failed for: {failed_files}")
-            return JSONResponse(status_code=422, content={"error": f"Failed to process: {failed_files}. Files may be empty or unreadable."})
-            
+        logger.info(f"recieved {len(files)} files for workspace {workspace}")
+        try:
+            workspace = normalize_workspace(workspace)
+        except InvalidWorkspaceError as e:
+            return invalid_workspace_response(e)
+        if not job_manager.has_capacity():
+            return queue_full_response()
+        # Each file is tracked, staged and published by name, so one request can't carry a name twice
+        names = [upload_name(f) for f in files]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"Duplicate file names in one upload: {', '.join(duplicates)}", "code": "DUPLICATE_FILENAME"}
+            )
+
+        try:
+            await run_in_threadpool(create_workspace, workspace)
+            staged = await run_in_threadpool(stage_uploaded_files, files, workspace_paths(workspace).upload_dir)
+        except UploadTooLargeError as e:
+            return JSONResponse(status_code=413, content={"error": str(e), "code": "FILE_TOO_LARGE"})
+
+        # Files only replace earlier uploads of the same name once the job is admitted
+        saved_files = saved_uploads(staged)
+        try:
+            job = job_manager.submit(
+                saved_files, partial(ingest_files, workspace=workspace),
+                on_admit=lambda: publish_uploads(staged), workspace=workspace
+            )
+        except QueueFullError:
+            discard_uploads(staged)
+            return queue_full_response()
+        except DocumentBusyError as e:
+            discard_uploads(staged)
+            return document_busy_response(e.names)
+        except BaseException:
+            discard_uploads(staged)
+            raise
+
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job.id, "status": job.status, "workspace": workspace, "message": f"Queued {len(saved_files)} files for processing."}
+        )
+
     except Exception as e:
         logger.exception("Error during pdf upload")
         return JSONResponse(status_code=500,content={"error":str(e)})
 
+def queue_full_response():
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": "5"},
+        content={"error": "The server is busy processing other uploads. Please try again shortly.", "code": "QUEUE_FULL"}
+    )
+
+def document_busy_response(names):
+    return JSONResponse(
+        status_code=409,
+        headers={"Retry-After": "5"},
+        content={"error": f"Still processing an earlier upload of: {', '.join(names)}. Please try again shortly.", "code": "DOCUMENT_BUSY"}
+    )
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Job not found", "code": "JOB_NOT_FOUND"})
+    return job.to_dict()
+
 @app.get("/documents/")
-async def list_documents():
+async def list_documents(workspace: str = DEFAULT_WORKSPACE):
     from modules.load_vectorstore import get_all_documents
-    docs = get_all_documents()
-    return {"documents": docs}
+    workspace, error = existing_workspace(workspace)
+    if error is not None:
+        return error
+    docs = get_all_documents(workspace)
+    return {"workspace": workspace, "documents": docs}
 
-@app.delete("/documents/{filename}")
-async def delete_document_endpoint(filename: str):
+@app.delete("/documents/{filename:path}")
+async def delete_document_endpoint(filename: str, workspace: str = DEFAULT_WORKSPACE):
     from modules.load_vectorstore import delete_document
-    success = delete_document(filename)
+    workspace, error = existing_workspace(workspace)
+    if error is not None:
+        return error
+    if job_manager.is_busy(workspace, filename):
+        return document_busy_response([filename])
+    success = delete_document(filename, workspace)
     if success:
         return {"message": f"Document {filename} deleted"}
     else:
         return JSONResponse(status_code=500, content={"error": "Failed to delete document"})
+
+@app.get("/workspaces/")
+async def list_workspaces_endpoint():
+    """Every workspace with its document and chunk counts and index size on disk."""
+    stats = await run_in_threadpool(lambda: [workspace_stats(ws) for ws in list_workspaces()])
+    return {"workspaces": stats}
 # async def ask_quyestion(question:str=Form(...)):
 #     try:
 #         logger.info("fuser query:{question}")
@@ -79,73 +261,199 @@ async def delete_document_endpoint(filename: str):
 #         logger.exception("error processing question")
 #         return JSONResponse(status_code=500,content={"error":str(e)})
 
-@app.post("/ask/")
-async def ask_question(question: str = Form(...)):
+def precheck_question(question, workspaces=(DEFAULT_WORKSPACE,)):
+    """Returns an error response if the question can't be answered, else None."""
+    # Input Validation
+    if not question or not question.strip():
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Please enter a question.", "code": "EMPTY_QUESTION"}
+        )
+    return precheck_knowledge_base(workspaces)
+
+def precheck_knowledge_base(workspaces=(DEFAULT_WORKSPACE,)):
+    """Returns an error response if there is nothing to search yet, else None."""
+    for workspace in workspaces:
+        if not workspace_exists(workspace):
+            return workspace_not_found_response(workspace)
+
+    # Check if database exists and has data
+    if not os.path.exists(PERSIST_DIR):
+        return JSONResponse(
+            status_code=422,
+            content={
+                "error": "No documents uploaded yet. Please upload some files first.",
+                "code": "NO_DOCUMENTS"
+            }
+        )
+
+    # Check if collection is empty
     try:
-        # Input Validation
-        if not question or not question.strip():
-            return JSONResponse(
-                status_code=400,
-                content={"error": "Please enter a question.", "code": "EMPTY_QUESTION"}
-            )
-        
-        question = question.strip()
-        logger.info(f"user query: {question}")
-
-        from langchain_chroma import Chroma
-        from langchain_huggingface import HuggingFaceEmbeddings
-        from modules.llm import get_llm_chain
-        from modules.query_handlers import query_chain
-        import os
-
-        PERSIST_DIR = "./chroma_db"
-        
-        # Check if database exists and has data
-        if not os.path.exists(PERSIST_DIR):
+        count = sum(registry.collection(workspace).count() for workspace in workspaces)
+        if count == 0:
             return JSONResponse(
                 status_code=422,
                 content={
-                    "error": "No documents uploaded yet. Please upload some files first.",
-                    "code": "NO_DOCUMENTS"
+                    "error": "Your knowledge base is empty. Please upload some documents first.",
+                    "code": "EMPTY_DATABASE"
                 }
             )
-        
-        # 1. Initialize Embeddings
-        embed_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        
-        # 2. Load Chroma Vector Store
-        vectorstore = Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=embed_model,
-            collection_name="rag_app"
+    except Exception:
+        pass  # Fallback: let it proceed if count fails
+    return None
+
+def overloaded_response():
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(ASK_RETRY_AFTER)},
+        content={"error": "The server is busy answering other questions. Please try again shortly.", "code": "TOO_MANY_QUESTIONS"}
+    )
+
+def answer_question(question, workspaces=(DEFAULT_WORKSPACE,)):
+    """Cache lookup, retrieval and LLM call for one question. Blocking; runs on the query pool."""
+    # Serve repeated questions without retrieval or an LLM round trip
+    cached = answer_cache.get(question, workspaces)
+    if cached is not None:
+        logger.info("answer cache hit")
+        return {**cached, "cached": True}
+    generation = answer_cache.generation
+
+    # LLM + RetrievalQA chain; several workspaces are searched in parallel
+    chain = get_llm_chain(get_retriever(workspaces))
+    result = query_chain(chain, question)
+    answer_cache.put(question, result, generation, workspaces)
+
+    logger.info("query successful")
+    return result
+
+@app.post("/ask/")
+async def ask_question(question: str = Form(...), workspace: str = Form(DEFAULT_WORKSPACE)):
+    """`workspace` may name one workspace, a comma-separated list, or "*" for all."""
+    try:
+        try:
+            workspaces = resolve_workspaces(workspace)
+        except InvalidWorkspaceError as e:
+            return invalid_workspace_response(e)
+        error = await run_in_threadpool(precheck_question, question, workspaces)
+        if error is not None:
+            return error
+
+        question = question.strip()
+        logger.info(f"user query: {question} (workspaces: {','.join(workspaces)})")
+
+        # Identical questions in flight together share one retrieval + LLM call
+        key = (workspace_scope(workspaces), normalize_question(question), answer_cache.generation)
+        return await query_gate.run(answer_question, question, workspaces, key=key)
+
+    except QueryOverloadedError:
+        logger.warning("rejecting question: query queue full")
+        return overloaded_response()
+    except Exception as e:
+        logger.exception("Error processing question")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Something went wrong. Please try again later.", "code": "SERVER_ERROR"}
         )
-        
-        # Check if collection is empty
+
+@app.post("/ask/batch")
+async def ask_batch(questions: List[str] = Body(..., embed=True), workspace: str = Body(DEFAULT_WORKSPACE, embed=True)):
+    """
+    Answers a list of questions in one request: {"questions": [...], "workspace": "..."}.
+    Each result carries its own answer, sources and timings, or an error;
+    one failing question does not fail the batch.
+    """
+    try:
         try:
-            count = vectorstore._collection.count()
-            if count == 0:
-                return JSONResponse(
-                    status_code=422,
-                    content={
-                        "error": "Your knowledge base is empty. Please upload some documents first.",
-                        "code": "EMPTY_DATABASE"
-                    }
-                )
-        except Exception:
-            pass  # Fallback: let it proceed if count fails
-        
-        # 3. Create Retriever
-        retriever = vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 6}
+            workspaces = resolve_workspaces(workspace)
+        except InvalidWorkspaceError as e:
+            return invalid_workspace_response(e)
+        if not questions:
+            return JSONResponse(status_code=400, content={"error": "Please send at least one question.", "code": "EMPTY_BATCH"})
+        if len(questions) > ASK_BATCH_MAX_QUESTIONS:
+            return JSONResponse(
+                status_code=413,
+                content={"error": f"A batch can hold at most {ASK_BATCH_MAX_QUESTIONS} questions.", "code": "BATCH_TOO_LARGE"}
+            )
+        error = await run_in_threadpool(precheck_knowledge_base, workspaces)
+        if error is not None:
+            return error
+
+        logger.info(f"batch of {len(questions)} questions (workspaces: {','.join(workspaces)})")
+        results, timings = await query_gate.run(answer_batch, questions, workspaces)
+        failed = sum(1 for r in results if "error" in r)
+        return {"results": results, "answered": len(results) - failed, "failed": failed, "timings": timings}
+
+    except QueryOverloadedError:
+        logger.warning("rejecting batch: query queue full")
+        return overloaded_response()
+    except Exception as e:
+        logger.exception("Error processing question batch")
+        return JSONResponse(
+            status_code=500,
+            content={"error": "Something went wrong. Please try again later.", "code": "SERVER_ERROR"}
         )
 
-        # 4. LLM + RetrievalQA chain
-        chain = get_llm_chain(retriever)
-        result = query_chain(chain, question)
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-        logger.info("query successful")
-        return result
+@app.post("/ask/stream")
+async def ask_question_stream(question: str = Form(...), workspace: str = Form(DEFAULT_WORKSPACE)):
+    """Server-sent events: `sources` first, then `token` events, then `done` (or `error`)."""
+    try:
+        try:
+            workspaces = resolve_workspaces(workspace)
+        except InvalidWorkspaceError as e:
+            return invalid_workspace_response(e)
+        error = await run_in_threadpool(precheck_question, question, workspaces)
+        if error is not None:
+            return error
+        if not query_gate.has_capacity():
+            return overloaded_response()
+
+        question = question.strip()
+        logger.info(f"user query (stream): {question}")
+
+        cached = await run_in_threadpool(answer_cache.get, question, workspaces)
+        if cached is not None:
+            logger.info("answer cache hit")
+            events = iter([
+                ("sources", {"sources": cached["sources"]}),
+                ("token", {"content": cached["response"]}),
+                ("done", {**cached, "cached": True}),
+            ])
+        else:
+            generation = answer_cache.generation
+            events = None
+
+        def body():
+            # Plain generator: Starlette iterates it in a worker thread, off the event loop
+            try:
+                query_gate.admit()
+            except QueryOverloadedError:
+                yield sse("error", {"error": "The server is busy answering other questions. Please try again shortly.", "code": "TOO_MANY_QUESTIONS"})
+                return
+            try:
+                stream = events
+                if stream is None:
+                    # Opening a workspace's stores on first use is blocking I/O; keep it off the event loop
+                    try:
+                        stream = stream_query_chain(get_streaming_chain(get_retriever(workspaces)), question)
+                    except Exception:
+                        logger.exception("Error building the streaming chain")
+                        yield sse("error", {"error": "Something went wrong. Please try again later.", "code": "SERVER_ERROR"})
+                        return
+                for event, data in stream:
+                    if event == "done" and cached is None:
+                        answer_cache.put(question, {"response": data["response"], "sources": data["sources"]}, generation, workspaces)
+                    yield sse(event, data)
+            finally:
+                query_gate.release()
+
+        return StreamingResponse(
+            body(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
 
     except Exception as e:
         logger.exception("Error processing question")
@@ -157,4 +465,17 @@ async def ask_question(question: str = Form(...)):
 
 @app.get("/test")
 async def test():
-    return {"message":"Testing successfull..."}
\ No newline at end of file
+    return {"message":"Testing successfull..."}
+
+@app.get("/ready")
+async def ready():
+    status=registry.status()
+    status["answer_cache"]=answer_cache.stats()
+    status["query_gate"]=query_gate.stats()
+    if not status["ready"]:
+        return JSONResponse(status_code=503,content=status)
+    return status
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(),media_type="text/plain; version=0.0.4")
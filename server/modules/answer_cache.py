@@ -0,0 +1,129 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    DEFAULT_WORKSPACE, ANSWER_CACHE_ENABLED, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL, ANSWER_CACHE_SEMANTIC_THRESHOLD
+)
+from logger import logger
+from modules.resources import registry
+
+
+def normalize_question(question):
+    question = " ".join(question.lower().split())
+    return re.sub(r"[\s?!.]+$", "", question)
+
+
+def workspace_scope(workspaces):
+    """Order-independent key for the set of workspaces a question searched."""
+    return tuple(sorted(set(workspaces)))
+
+
+class AnswerCache:
+    """
+    In-process cache of /ask/ responses with TTL and LRU eviction.
+
+    Lookups first try an exact match on the normalized question. When
+    `semantic_threshold` is set, a miss falls back to the cached question
+    whose embedding has the highest cosine similarity, if it clears the
+    threshold. Entries are keyed by the workspaces searched as well, and
+    only match questions over the same workspaces. invalidate(workspace)
+    drops every answer that searched that workspace whenever its documents
+    change; `generation` lets callers avoid storing answers computed
+    against a corpus that changed mid-request.
+    """
+
+    def __init__(self, embed=None, max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL,
+                 semantic_threshold=ANSWER_CACHE_SEMANTIC_THRESHOLD, enabled=ANSWER_CACHE_ENABLED):
+        self.embed = embed
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        self.enabled = enabled
+        self.generation = 0
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (scope, question) -> (created_at, unit vector or None, response)
+        self._lock = threading.Lock()
+
+    def _vector(self, question):
+        import numpy as np
+        vec = np.asarray(self.embed(question), dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _expire(self, now):
+        for key in [k for k, (created, _, _) in self._entries.items() if now - created > self.ttl]:
+            del self._entries[key]
+
+    def get(self, question, workspaces=(DEFAULT_WORKSPACE,)):
+        if not self.enabled:
+            return None
+        scope = workspace_scope(workspaces)
+        key = (scope, normalize_question(question))
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            candidates = [(k, e[1]) for k, e in self._entries.items() if e[1] is not None and k[0] == scope]
+
+        if self.semantic_threshold > 0 and self.embed and candidates:
+            import numpy as np
+            query_vec = self._vector(question)
+            scores = np.stack([vec for _, vec in candidates]) @ query_vec
+            best = int(np.argmax(scores))
+            if scores[best] >= self.semantic_threshold:
+                with self._lock:
+                    entry = self._entries.get(candidates[best][0])
+                    if entry is not None:
+                        self._entries.move_to_end(candidates[best][0])
+                        self.semantic_hits += 1
+                        logger.debug(f"semantic answer cache hit ({scores[best]:.3f})")
+                        return entry[2]
+
+        self.misses += 1
+        return None
+
+    def put(self, question, response, generation, workspaces=(DEFAULT_WORKSPACE,)):
+        """Stores `response` unless the corpus changed since `generation` was read."""
+        if not self.enabled:
+            return
+        vector = self._vector(question) if self.semantic_threshold > 0 and self.embed else None
+        with self._lock:
+            if generation != self.generation:
+                return
+            key = (workspace_scope(workspaces), normalize_question(question))
+            self._entries[key] = (time.time(), vector, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, workspace=None):
+        """Drops answers that searched `workspace`, or every answer when it is None."""
+        with self._lock:
+            self.generation += 1
+            stale = [k for k in self._entries if workspace is None or workspace in k[0]]
+            for key in stale:
+                del self._entries[key]
+            dropped = len(stale)
+        if dropped:
+            logger.info(f"answer cache invalidated ({dropped} entries dropped)")
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "generation": self.generation,
+        }
+
+
+answer_cache = AnswerCache(embed=lambda question: registry.embed_model().embed_query(question))
@@ -0,0 +1,197 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DEFAULT_WORKSPACE, RETRIEVER_K, ASK_BATCH_PARALLELISM, ASK_BATCH_RATE_LIMIT, HYBRID_FETCH_K
+from logger import get_logger
+from modules.resources import registry
+from modules.answer_cache import answer_cache, normalize_question
+from modules.llm import prepare_prompt
+from modules.query_gate import query_gate, limited
+from modules.query_handlers import source_list
+from modules.lexical_index import reciprocal_rank_fusion, doc_key
+from modules.retrieval import ShardedRetriever
+from modules.metrics import StageTimer, QUERY_STAGE_LATENCY
+
+logger = get_logger("query")
+
+
+class RateLimiter:
+    """Spaces call starts at least 1/rate seconds apart across threads; rate <= 0 disables it."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+# Shared by every batch so concurrent batches together stay under the provider's limit
+llm_rate_limiter = RateLimiter(ASK_BATCH_RATE_LIMIT)
+
+
+def search_batch(vectors, k, questions=None, workspace=DEFAULT_WORKSPACE):
+    """
+    Top-k Documents for each query vector; one multi-query call against
+    the workspace's Chroma collection. With the lexical index enabled and
+    `questions` given, each question's vector hits are fused with its BM25
+    hits.
+    """
+    from langchain_core.documents import Document
+
+    lexical_index = registry.lexical_index(workspace) if questions is not None else None
+    fetch_k = max(k, HYBRID_FETCH_K) if lexical_index is not None else k
+    read_index = registry.read_index(workspace)
+    if read_index is not None:
+        dense = [
+            [Document(page_content=text, metadata=meta) for _, text, meta, _ in read_index.search(vector, fetch_k)]
+            for vector in vectors
+        ]
+    else:
+        result = registry.collection(workspace).query(query_embeddings=vectors, n_results=fetch_k, include=["documents", "metadatas"])
+        dense = [
+            [Document(page_content=text, metadata=meta or {}) for text, meta in zip(texts, metas)]
+            for texts, metas in zip(result["documents"], result["metadatas"])
+        ]
+    if lexical_index is None:
+        return dense
+    fused = []
+    for question, docs in zip(questions, dense):
+        sparse = [Document(page_content=text, metadata=meta) for _, text, meta, _ in lexical_index.search(question, fetch_k)]
+        fused.append(reciprocal_rank_fusion([[(doc_key(d), d) for d in docs], [(doc_key(d), d) for d in sparse]], k))
+    return fused
+
+
+SERVER_ERROR = {"error": "Something went wrong answering this question.", "code": "SERVER_ERROR"}
+
+
+def search_each(questions, vectors, failed, workspaces, k):
+    """
+    Retrieved Documents for each question not already in `failed`, with
+    one multi-query call when a single workspace is searched. If that call
+    fails, each question is searched on its own so only the ones that still
+    fail are added to `failed`.
+    """
+    docs_per_question = [[] for _ in questions]
+    todo = [j for j in range(len(questions)) if j not in failed]
+    if len(workspaces) == 1 and todo:
+        try:
+            found = search_batch([vectors[j] for j in todo], k, [questions[j] for j in todo], workspaces[0])
+            for j, docs in zip(todo, found):
+                docs_per_question[j] = docs
+            return docs_per_question
+        except Exception:
+            logger.exception("batch search failed, retrying question by question")
+    retriever = ShardedRetriever(workspaces, k=k) if len(workspaces) > 1 else None
+    for j in todo:
+        try:
+            if retriever is not None:
+                docs_per_question[j] = retriever.search(questions[j], vectors[j])
+            else:
+                docs_per_question[j] = search_batch([vectors[j]], k, [questions[j]], workspaces[0])[0]
+        except Exception:
+            logger.exception(f"batch question search failed: {questions[j]}")
+            failed[j] = SERVER_ERROR
+    return docs_per_question
+
+
+def answer_batch(questions, workspaces=(DEFAULT_WORKSPACE,), k=RETRIEVER_K, parallelism=ASK_BATCH_PARALLELISM):
+    """
+    Answers many questions in one pass. Cached answers are returned as is;
+    the remaining distinct questions are embedded as /ask embeds them and
+    searched in one multi-query call (per question across workspaces when
+    several are given), then their LLM calls fan out over `parallelism`
+    threads under the shared rate limit. A question that fails at any stage
+    gets an error entry and the rest still complete.
+
+    Returns (per-question results in input order, batch-level timings).
+    """
+    start = time.perf_counter()
+    generation = answer_cache.generation
+    results = [None] * len(questions)
+    pending = {}  # normalized question -> input positions still needing an answer
+    for i, question in enumerate(questions):
+        question = (question or "").strip()
+        if not question:
+            results[i] = {"question": question, "error": "Please enter a question.", "code": "EMPTY_QUESTION"}
+            continue
+        cached = answer_cache.get(question, workspaces)
+        if cached is not None:
+            results[i] = {"question": question, **cached, "cached": True, "timings": {}}
+            continue
+        pending.setdefault(normalize_question(question), []).append(i)
+
+    timings = {}
+    unique = [questions[positions[0]].strip() for positions in pending.values()]
+    failed = {}  # index into unique -> error entry, for questions that never reach the LLM
+    if unique:
+        t0 = time.perf_counter()
+        # The same query embedding /ask uses, so a batch answer matches the single one
+        embed_model = registry.embed_model()
+        vectors = [None] * len(unique)
+        with query_gate.embed_slots:
+            for j, question in enumerate(unique):
+                try:
+                    vectors[j] = embed_model.embed_query(question)
+                except Exception:
+                    logger.exception(f"batch question embedding failed: {question}")
+                    failed[j] = SERVER_ERROR
+        timings["embed"] = time.perf_counter() - t0
+        QUERY_STAGE_LATENCY.observe(timings["embed"], stage="batch_embed")
+
+        t0 = time.perf_counter()
+        docs_per_question = search_each(unique, vectors, failed, workspaces, k)
+        timings["search"] = time.perf_counter() - t0
+        QUERY_STAGE_LATENCY.observe(timings["search"], stage="batch_search")
+
+        llm = registry.llm()
+
+        def answer(question, docs, vector):
+            timer = StageTimer(QUERY_STAGE_LATENCY)
+            prompt, docs, packing = prepare_prompt(question, docs, vector, timer)
+            with timer.stage("rate_limit_wait"):
+                llm_rate_limiter.wait()
+            # Same LLM slots as /ask, so batches can't exceed ASK_LLM_CONCURRENCY between them
+            with limited(query_gate.llm_slots, timer, "llm"):
+                response = llm.invoke(prompt)
+            return (
+                {"response": response.content, "sources": source_list(docs), "context": packing},
+                timer.timings,
+            )
+
+        with ThreadPoolExecutor(max_workers=max(1, parallelism), thread_name_prefix="ask-batch") as pool:
+            futures = [
+                None if j in failed else pool.submit(contextvars.copy_context().run, answer, question, docs, vector)
+                for j, (question, docs, vector) in enumerate(zip(unique, docs_per_question, vectors))
+            ]
+            for j, (positions, question, future) in enumerate(zip(pending.values(), unique, futures)):
+                if future is None:
+                    entry = failed[j]
+                else:
+                    try:
+                        result, question_timings = future.result()
+                        answer_cache.put(question, result, generation, workspaces)
+                        entry = {**result, "cached": False, "timings": {n: round(v, 3) for n, v in question_timings.items()}}
+                    except Exception:
+                        logger.exception(f"batch question failed: {question}")
+                        entry = SERVER_ERROR
+                for i in positions:
+                    results[i] = {"question": questions[i].strip(), **entry}
+
+    timings["total"] = time.perf_counter() - start
+    logger.info(
+        f"batch of {len(questions)} questions ({len(unique)} distinct, uncached) in {timings['total']:.3f}s"
+    )
+    return results, {n: round(v, 3) for n, v in timings.items()}
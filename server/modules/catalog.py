@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+from config import CATALOG_PATH
+from logger import logger
+
+# Rows fetched per page when scanning the Chroma collection
+_SCAN_PAGE = 5000
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def document_name(source, upload_dir=None):
+    """
+    Catalog name for a chunk source. Uploads are named by their filename;
+    files bulk_ingest.py indexes in place are named by their full path, so
+    same-named files in different folders stay separate documents.
+    """
+    path = Path(source).resolve()
+    if upload_dir is None or path.parent == Path(upload_dir).resolve():
+        return os.path.basename(source)
+    return path.as_posix()
+
+
+class DocumentCatalog:
+    """
+    SQLite sidecar that records every ingested file (hash, size, pages,
+    ingest time) and the ids of its chunks. Listing and deleting are served
+    from here, so they cost O(documents) instead of scanning every chunk in
+    the Chroma collection.
+    """
+
+    def __init__(self, path=CATALOG_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                name TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                file_hash TEXT,
+                size INTEGER,
+                page_count INTEGER,
+                chunk_count INTEGER NOT NULL,
+                ingested_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                name TEXT NOT NULL REFERENCES documents(name) ON DELETE CASCADE
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_name ON chunks(name);
+        """)
+        self._db.commit()
+
+    def upsert_document(self, name, source, file_hash, size, page_count, chunk_ids, ingested_at=None):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM chunks WHERE name=?", (name,))
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (name, source, file_hash, size, page_count, chunk_count, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, source, file_hash, size, page_count, len(chunk_ids), ingested_at or time.time())
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, name) VALUES (?, ?)", [(cid, name) for cid in chunk_ids]
+            )
+
+    def get(self, name):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT name, source, file_hash, size, page_count, chunk_count, ingested_at FROM documents WHERE name=?",
+                (name,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("name", "source", "file_hash", "size", "page_count", "chunk_count", "ingested_at"), row))
+
+    def chunk_ids(self, name):
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT chunk_id FROM chunks WHERE name=?", (name,))]
+
+    def list_documents(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name, file_hash, size, page_count, chunk_count, ingested_at FROM documents ORDER BY name"
+            ).fetchall()
+        return [dict(zip(("name", "file_hash", "size", "page_count", "chunk_count", "ingested_at"), r)) for r in rows]
+
+    def remove_document(self, name):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM documents WHERE name=?", (name,))
+
+    def is_empty(self):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM documents LIMIT 1").fetchone() is None
+
+    def rebuild_from_collection(self, collection, upload_dir=None):
+        """
+        Repopulates the catalog from chunk metadata in an existing Chroma
+        collection, paging through it so memory stays bounded.
+        """
+        docs = {}
+        names = {}  # source -> name, resolved once per file rather than per chunk
+        offset = 0
+        while True:
+            page = collection.get(include=["metadatas"], limit=_SCAN_PAGE, offset=offset)
+            if not page["ids"]:
+                break
+            for chunk_id, meta in zip(page["ids"], page["metadatas"]):
+                if not meta or "source" not in meta:
+                    continue
+                source = meta["source"]
+                if source not in names:
+                    names[source] = document_name(source, upload_dir)
+                name = names[source]
+                doc = docs.setdefault(name, {"source": meta["source"], "file_hash": None, "pages": set(), "ids": []})
+                doc["ids"].append(chunk_id)
+                doc["file_hash"] = doc["file_hash"] or meta.get("file_hash")
+                if "page" in meta:
+                    doc["pages"].add(meta["page"])
+            offset += len(page["ids"])
+
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM chunks")
+            self._db.execute("DELETE FROM documents")
+        for name, doc in docs.items():
+            path = doc["source"]
+            size = os.path.getsize(path) if os.path.exists(path) else None
+            self.upsert_document(name, doc["source"], doc["file_hash"], size, len(doc["pages"]) or 1, doc["ids"])
+        logger.info(f"catalog rebuilt: {len(docs)} documents, {offset} chunks")
+        return {"documents": len(docs), "chunks": offset}
+
+    def bootstrap(self, collection, upload_dir=None):
+        """Rebuilds once for databases created before the catalog existed."""
+        if self.is_empty() and collection.count() > 0:
+            logger.info("catalog empty but collection has chunks; rebuilding catalog")
+            self.rebuild_from_collection(collection, upload_dir)
+
+
+if __name__ == "__main__":
+    # python -m modules.catalog rebuild [workspace]
+    if sys.argv[1:2] != ["rebuild"] or len(sys.argv) > 3:
+        print("usage: python -m modules.catalog rebuild [workspace]")
+        sys.exit(1)
+    from config import DEFAULT_WORKSPACE
+    from modules.resources import registry
+    from modules.workspaces import workspace_paths
+    workspace = sys.argv[2] if len(sys.argv) == 3 else DEFAULT_WORKSPACE
+    stats = registry.catalog(workspace).rebuild_from_collection(
+        registry.collection(workspace), workspace_paths(workspace).upload_dir
+    )
+    print(f"✅ Catalog rebuilt: {stats['documents']} documents, {stats['chunks']} chunks")
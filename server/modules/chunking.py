@@ -0,0 +1,109 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from config import (
+    EMBED_MODEL_NAME, CHUNK_SIZE_MODE, CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_WORKERS, CHUNK_PARALLEL_MIN_PAGES
+)
+
+# Pages are shipped to workers in groups to amortize pickling/IPC per task
+_PAGES_PER_TASK = 8
+
+_splitter = None
+_splitter_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def build_splitter(mode=CHUNK_SIZE_MODE, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """
+    Text splitter sized in embedding-model tokens (default) or characters.
+    Token sizing keeps every chunk inside the encoder's window, so nothing
+    is silently truncated at embed time.
+    """
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    if mode == "tokens":
+        try:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(f"sentence-transformers/{EMBED_MODEL_NAME}")
+            return RecursiveCharacterTextSplitter.from_huggingface_tokenizer(
+                tokenizer, chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+            )
+        except Exception:
+            # Tokenizer unavailable (offline, missing package): ~4 chars per token
+            chunk_size, chunk_overlap = chunk_size * 4, chunk_overlap * 4
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True)
+
+
+def _get_splitter():
+    global _splitter
+    if _splitter is None:
+        with _splitter_lock:
+            if _splitter is None:
+                _splitter = build_splitter()
+    return _splitter
+
+
+def _split_pages(pages):
+    """
+    Splits [(text, metadata), ...] page by page and returns [(text, metadata), ...]
+    chunks with `start_index`/`end_index` character offsets within the page.
+    Runs inside a pool worker for large documents.
+    """
+    splitter = _get_splitter()
+    out = []
+    for text, metadata in pages:
+        for chunk in splitter.create_documents([text], [metadata]):
+            meta = chunk.metadata
+            meta["end_index"] = meta["start_index"] + len(chunk.page_content)
+            out.append((chunk.page_content, meta))
+    return out
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=CHUNK_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_get_splitter,
+                )
+    return _pool
+
+
+def chunk_length(text):
+    """Length of `text` in the units chunks are sized in (model tokens or characters)."""
+    return _get_splitter()._length_function(text)
+
+
+def chunk_budget():
+    """Chunk size in the units of chunk_length()."""
+    return _get_splitter()._chunk_size
+
+
+def split_documents(documents):
+    """
+    Splits page-level Documents into chunks, one page at a time so every
+    chunk keeps its `source`, `page` and character offsets. Large documents
+    are split in parallel worker processes; chunk order is preserved.
+    """
+    from langchain_core.documents import Document
+
+    pages = [(doc.page_content, dict(doc.metadata)) for doc in documents]
+    if CHUNK_WORKERS <= 1 or len(pages) < CHUNK_PARALLEL_MIN_PAGES:
+        results = _split_pages(pages)
+    else:
+        groups = [pages[i:i + _PAGES_PER_TASK] for i in range(0, len(pages), _PAGES_PER_TASK)]
+        results = [chunk for group in _get_pool().map(_split_pages, groups) for chunk in group]
+    return [Document(page_content=text, metadata=meta) for text, meta in results]
+
+
+def shutdown_chunk_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
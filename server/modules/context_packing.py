@@ -0,0 +1,201 @@
+import re
+import threading
+
+from config import (
+    EMBED_MODEL_NAME, CONTEXT_PACKING_ENABLED, CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD,
+    CONTEXT_MMR_ENABLED, CONTEXT_MMR_LAMBDA
+)
+
+# Chunks without offsets are merged only if they share at least this many characters
+_MIN_TEXT_OVERLAP = 32
+_MAX_TEXT_OVERLAP = 4000
+# Offsets this close count as touching (the splitter strips whitespace between chunks)
+_ADJACENT_GAP = 3
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def count_tokens(text):
+    """Tokens in `text` per the embedding model's tokenizer, or ~4 characters per token without it."""
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                try:
+                    from transformers import AutoTokenizer
+                    _tokenizer = AutoTokenizer.from_pretrained(f"sentence-transformers/{EMBED_MODEL_NAME}")
+                except Exception:
+                    _tokenizer = False
+    if _tokenizer:
+        return len(_tokenizer.encode(text, add_special_tokens=False, verbose=False))
+    return max(1, len(text) // 4)
+
+
+def _text_overlap(a, b):
+    """Length of the longest suffix of `a` that is also a prefix of `b`."""
+    probe = b[:_MIN_TEXT_OVERLAP]
+    if len(probe) < _MIN_TEXT_OVERLAP:
+        return 0
+    start = a.find(probe, max(0, len(a) - _MAX_TEXT_OVERLAP))
+    while start != -1:
+        if b.startswith(a[start:]):
+            return len(a) - start
+        start = a.find(probe, start + 1)
+    return 0
+
+
+def _merge_by_offsets(group):
+    group.sort(key=lambda b: b["start"])
+    merged = [group[0]]
+    for block in group[1:]:
+        last = merged[-1]
+        if block["start"] > last["end"] + _ADJACENT_GAP:
+            merged.append(block)
+            continue
+        if block["end"] > last["end"]:
+            if block["start"] >= last["end"]:
+                last["text"] += "\n" + block["text"]
+            else:
+                last["text"] += block["text"][last["end"] - block["start"]:]
+            last["end"] = block["end"]
+        last["rank"] = min(last["rank"], block["rank"])
+        last["parts"] += block["parts"]
+    return merged
+
+
+def _merge_by_text(group):
+    merged = []
+    for block in sorted(group, key=lambda b: b["rank"]):
+        for last in merged:
+            if block["text"] in last["text"]:
+                break
+            overlap = _text_overlap(last["text"], block["text"])
+            if overlap:
+                last["text"] += block["text"][overlap:]
+                break
+            overlap = _text_overlap(block["text"], last["text"])
+            if overlap:
+                last["text"] = block["text"] + last["text"][overlap:]
+                break
+        else:
+            merged.append(block)
+            continue
+        last["parts"] += block["parts"]
+    return merged
+
+
+def _parent_key(meta):
+    # Offsets count from the start of the document a chunk was split from: a
+    # PDF page, or one row group of a sheet (several share the sheet's `page`)
+    return (meta.get("source"), meta.get("page"), meta.get("sheet"), meta.get("row_start"))
+
+
+def merge_adjacent(docs):
+    """
+    Joins retrieved chunks from the same parent document that overlap or
+    touch, using the `start_index`/`end_index` offsets written at chunking
+    time, or the text itself for chunks indexed before offsets existed.
+    Blocks come back in the rank order of their best chunk.
+    """
+    groups = {}
+    for rank, doc in enumerate(docs):
+        meta = dict(doc.metadata or {})
+        block = {
+            "rank": rank, "text": doc.page_content, "metadata": meta, "parts": 1,
+            "start": meta.get("start_index"), "end": meta.get("end_index"),
+        }
+        groups.setdefault(_parent_key(meta), []).append(block)
+
+    blocks = []
+    for group in groups.values():
+        if all(b["start"] is not None and b["end"] is not None for b in group):
+            blocks.extend(_merge_by_offsets(group))
+        else:
+            blocks.extend(_merge_by_text(group))
+    blocks.sort(key=lambda b: b["rank"])
+    return blocks
+
+
+def _shingles(text, n=3):
+    words = re.findall(r"\w+", text.lower())
+    return {tuple(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+
+
+def drop_near_duplicates(blocks, threshold=CONTEXT_DEDUP_THRESHOLD):
+    """Drops a block when `threshold` of its word 3-grams already appear in one higher-ranked block."""
+    kept, kept_shingles = [], []
+    for block in blocks:
+        shingles = _shingles(block["text"])
+        if any(len(shingles & other) >= threshold * len(shingles) for other in kept_shingles):
+            continue
+        kept.append(block)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def mmr_order(blocks, query_vector, embed, lambda_mult=CONTEXT_MMR_LAMBDA):
+    """Maximal marginal relevance: trades each block's relevance against similarity to those already picked."""
+    import numpy as np
+
+    if len(blocks) < 3 or query_vector is None:
+        return blocks
+    vectors = np.asarray(embed.embed_documents([b["text"] for b in blocks]), dtype=np.float32)
+    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+    query = np.asarray(query_vector, dtype=np.float32)
+    relevance = vectors @ (query / max(np.linalg.norm(query), 1e-12))
+    similarity = vectors @ vectors.T
+
+    picked, remaining = [], list(range(len(blocks)))
+    while remaining:
+        if picked:
+            redundancy = similarity[np.ix_(remaining, picked)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy
+        picked.append(remaining.pop(int(np.argmax(scores))))
+    return [blocks[i] for i in picked]
+
+
+def fit_budget(blocks, budget=CONTEXT_TOKEN_BUDGET):
+    """Keeps blocks in order while they fit; the first block is truncated rather than dropped."""
+    kept, used = [], 0
+    for block in blocks:
+        tokens = count_tokens(block["text"])
+        if used + tokens <= budget:
+            kept.append(block)
+            used += tokens
+        elif not kept:
+            block["text"] = block["text"][:int(len(block["text"]) * budget / tokens)]
+            if block["start"] is not None:
+                block["end"] = block["start"] + len(block["text"])
+            kept.append(block)
+            used = count_tokens(block["text"])
+    return kept, used
+
+
+def pack_context(docs, query_vector=None, embed=None, budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Turns retrieved chunks into the context for one prompt: merge
+    overlapping neighbours, drop near-duplicates, optionally reorder by
+    MMR, then fit the token budget. Returns (Documents, stats).
+    """
+    from langchain_core.documents import Document
+
+    tokens_before = sum(count_tokens(d.page_content) for d in docs)
+    stats = {"chunks_before": len(docs), "context_tokens_before": tokens_before}
+    if not CONTEXT_PACKING_ENABLED or not docs:
+        return docs, {**stats, "chunks_after": len(docs), "context_tokens_after": tokens_before}
+
+    blocks = drop_near_duplicates(merge_adjacent(docs))
+    if CONTEXT_MMR_ENABLED and embed is not None:
+        blocks = mmr_order(blocks, query_vector, embed)
+    blocks, tokens_after = fit_budget(blocks, budget)
+
+    packed = []
+    for block in blocks:
+        meta = block["metadata"]
+        if block["start"] is not None and block["end"] is not None:
+            meta.update(start_index=block["start"], end_index=block["end"])
+        packed.append(Document(page_content=block["text"], metadata=meta))
+    return packed, {**stats, "chunks_after": len(packed), "context_tokens_after": tokens_after}
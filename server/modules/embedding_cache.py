@@ -0,0 +1,132 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES, EMBED_CACHE_DTYPE
+from logger import logger
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings object with a persistent on-disk cache.
+
+    Vectors are keyed by a hash of the model name and the whitespace-
+    normalized text and stored as compact float16/float32 blobs in SQLite.
+    Least-recently-used entries are evicted once `max_entries` is exceeded.
+    Re-uploads, rebuilds and repeated questions therefore skip the encoder.
+    """
+
+    def __init__(self, underlying, model_name, path=EMBED_CACHE_PATH,
+                 max_entries=EMBED_CACHE_MAX_ENTRIES, dtype=EMBED_CACHE_DTYPE):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._db.commit()
+        self._count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _key(self, text, kind):
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{self.model_name}\x00{kind}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    def _encode(self, vector):
+        return np.asarray(vector, dtype=self.dtype).tobytes()
+
+    def _decode(self, blob):
+        return np.frombuffer(blob, dtype=self.dtype).astype(np.float32).tolist()
+
+    def _lookup(self, keys):
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), _SQL_BATCH):
+                batch = keys[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    self._db.executemany("UPDATE embeddings SET last_used=? WHERE key=?", [(now, k) for k, _ in rows])
+            self._db.commit()
+        return found
+
+    def _store(self, items):
+        now = time.time()
+        with self._lock:
+            cur = self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, blob, now) for key, blob in items]
+            )
+            self._count += max(cur.rowcount, 0)
+            if self._count > self.max_entries:
+                self._evict(self._count - self.max_entries)
+            self._db.commit()
+
+    def _evict(self, n):
+        # Drop a little extra so we don't evict on every single insert
+        n += max(1, self.max_entries // 20)
+        self._db.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (n,)
+        )
+        self._count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self.evictions += n
+        logger.info(f"embedding cache evicted {n} entries ({self._count} left)")
+
+    def _embed(self, texts, kind, compute):
+        keys = [self._key(t, kind) for t in texts]
+        cached = self._lookup(list(dict.fromkeys(keys)))
+
+        # Encode each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self.hits += len(keys) - sum(1 for k in keys if k in missing)
+        self.misses += len(missing)
+
+        if missing:
+            vectors = compute(list(missing.values()))
+            new_items = [(key, self._encode(vec)) for key, vec in zip(missing, vectors)]
+            self._store(new_items)
+            cached.update(new_items)
+
+        # Always return the stored precision so hits and misses agree
+        return [self._decode(cached[key]) for key in keys]
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return self._embed(texts, "doc", self.underlying.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed([text], "query", lambda ts: [self.underlying.embed_query(ts[0])])[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
@@ -0,0 +1,70 @@
+import contextvars
+import inspect
+import queue
+import threading
+
+_DONE = object()
+
+
+def run_pipeline(items, stages, sink, on_error, queue_size=2):
+    """
+    Streams `items` through `stages` ([(name, fn), ...]), each running in its
+    own thread and connected by bounded queues, then hands every result to
+    `sink` on the calling thread.
+
+    A stage function returns the item for the next stage, or None to drop it
+    (e.g. nothing to do). A generator stage may instead yield several items,
+    each queued as soon as it is produced. If a stage or the sink raises,
+    `on_error(item, stage_name, exc)` is called and only that item is
+    dropped, so one bad file never loses the rest of the batch. Because the queues are bounded,
+    at most a few items are in flight at once and memory stays flat no
+    matter how many items are fed in.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+
+    def feed():
+        for item in items:
+            queues[0].put(item)
+        queues[0].put(_DONE)
+
+    def work(index, name, fn):
+        inbox, outbox = queues[index], queues[index + 1]
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                outbox.put(_DONE)
+                return
+            try:
+                result = fn(item)
+                if inspect.isgenerator(result):
+                    for part in result:
+                        outbox.put(part)
+                    continue
+            except Exception as e:
+                on_error(item, name, e)
+                continue
+            if result is not None:
+                outbox.put(result)
+
+    # Each stage thread runs in a copy of the caller's context so log records keep the job id
+    threads = [threading.Thread(target=contextvars.copy_context().run, args=(feed,), name="pipeline-feed", daemon=True)]
+    threads += [
+        threading.Thread(
+            target=contextvars.copy_context().run, args=(work, i, name, fn), name=f"pipeline-{name}", daemon=True
+        )
+        for i, (name, fn) in enumerate(stages)
+    ]
+    for t in threads:
+        t.start()
+
+    while True:
+        item = queues[-1].get()
+        if item is _DONE:
+            break
+        try:
+            sink(item)
+        except Exception as e:
+            on_error(item, "write", e)
+
+    for t in threads:
+        t.join()
@@ -0,0 +1,176 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import INGEST_WORKERS, INGEST_QUEUE_LIMIT, INGEST_JOB_HISTORY
+from logger import get_logger, job_id_var
+
+logger = get_logger("jobs")
+
+
+class QueueFullError(Exception):
+    """Raised when the ingestion queue already holds INGEST_QUEUE_LIMIT jobs."""
+
+
+class DocumentBusyError(Exception):
+    """Raised when a queued or running job already holds one of the uploaded documents."""
+
+    def __init__(self, names):
+        self.names = sorted(names)
+        super().__init__("Already being processed: " + ", ".join(self.names))
+
+
+class IngestionJob:
+    def __init__(self, uploads, workspace=None):
+        self.id = uuid.uuid4().hex
+        self.uploads = list(uploads)
+        self.workspace = workspace
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.files = {
+            u.path.name: {"stage": "queued", "chunks": 0, "size": u.size, "timings": {}, "error": None}
+            for u in self.uploads
+        }
+        self._lock = threading.Lock()
+
+    def update_file(self, name, stage, **fields):
+        """Progress callback handed to ingest_files."""
+        with self._lock:
+            entry = self.files.setdefault(name, {"stage": "queued", "chunks": 0, "timings": {}, "error": None})
+            entry["stage"] = stage
+            for key, value in fields.items():
+                if key.endswith("_s"):
+                    entry["timings"][key[:-2]] = round(value, 3)
+                else:
+                    entry[key] = value
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "duration_s": round(self.finished_at - self.started_at, 3) if self.finished_at and self.started_at else None,
+                "files": {name: dict(entry, timings=dict(entry["timings"])) for name, entry in self.files.items()},
+                "result": self.result,
+                "error": self.error,
+            }
+
+    def documents(self):
+        """The (workspace, filename) pairs this job writes."""
+        return {(self.workspace, u.path.name) for u in self.uploads}
+
+    def failure_message(self, failed):
+        """Why the job failed, from the per-file errors of the files in `failed`."""
+        with self._lock:
+            errors = [f"{name}: {self.files.get(name, {}).get('error') or 'failed'}" for name in failed]
+        return "; ".join(errors) or "No files were ingested"
+
+
+class JobManager:
+    """
+    Runs ingestion jobs on a bounded thread pool so uploads never block the
+    event loop. At most `max_workers` jobs run at once and at most
+    `max_queued` may be waiting or running; beyond that submit() raises
+    QueueFullError. A document is written by one job at a time: submitting
+    a file that a queued or running job holds in the same workspace raises
+    DocumentBusyError.
+    """
+
+    def __init__(self, max_workers=INGEST_WORKERS, max_queued=INGEST_QUEUE_LIMIT, history=INGEST_JOB_HISTORY):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs = OrderedDict()
+        self._active = 0
+        self._busy = set()  # (workspace, filename) held by queued and running jobs
+        self._lock = threading.Lock()
+
+    def has_capacity(self):
+        with self._lock:
+            return self._active < self.max_queued
+
+    def is_busy(self, workspace, name):
+        with self._lock:
+            return (workspace, name) in self._busy
+
+    def submit(self, uploads, run, on_admit=None, workspace=None):
+        """
+        Queues `run(uploads, progress)` and returns the new job. `on_admit()`
+        runs once the job has a queue slot and before it can start (uploads
+        are published there); if it raises, the job is not queued.
+        """
+        job = IngestionJob(uploads, workspace)
+        documents = job.documents()
+        with self._lock:
+            if self._active >= self.max_queued:
+                raise QueueFullError(f"Ingestion queue is full ({self.max_queued} jobs). Please retry shortly.")
+            # Checked before on_admit, so a file is never replaced under a job still reading it
+            busy = documents & self._busy
+            if busy:
+                raise DocumentBusyError(name for _, name in busy)
+            if on_admit is not None:
+                on_admit()
+            self._active += 1
+            self._busy |= documents
+            self._jobs[job.id] = job
+            self._trim_history()
+        self._executor.submit(self._run, job, run)
+        logger.info(f"queued ingestion job {job.id} with {len(job.uploads)} files")
+        return job
+
+    def _run(self, job, run):
+        job_id_var.set(job.id)
+        with job._lock:
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            result = run(job.uploads, job.update_file)
+            error = None if result.get("status") == "success" else job.failure_message(result.get("failed", []))
+            with job._lock:
+                job.result = result
+                job.status = "failed" if error else "completed"
+                job.error = error
+        except Exception as e:
+            logger.exception(f"Ingestion job {job.id} crashed")
+            with job._lock:
+                job.status = "failed"
+                job.error = str(e)
+        finally:
+            with job._lock:
+                job.finished_at = time.time()
+            with self._lock:
+                self._active -= 1
+                self._busy -= job.documents()
+            logger.info(f"ingestion job {job.id} {job.status} in {job.finished_at - job.started_at:.2f}s")
+
+    def _trim_history(self):
+        # Forget the oldest finished jobs once the history cap is reached
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.history:
+                break
+            if self._jobs[job_id].finished_at is not None:
+                del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {"active": self._active, "max_workers": self.max_workers, "max_queued": self.max_queued}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_manager = JobManager()
@@ -0,0 +1,258 @@
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import unicodedata
+from contextlib import nullcontext
+
+from config import LEXICAL_INDEX_PATH, LEXICAL_MAX_DF, RETRIEVER_K, HYBRID_FETCH_K, HYBRID_RRF_K
+from logger import get_logger
+
+logger = get_logger("index")
+
+# Rows fetched per page when exporting from the Chroma collection
+_SCAN_PAGE = 5000
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+# Common query words are only pruned once their posting lists get this long
+_PRUNE_MIN_DF = 1000
+
+# Same token boundaries as FTS5's unicode61 tokenizer: runs of letters and digits
+_TOKEN = re.compile(r"[^\W_]+")
+# Dropped from queries only; they match most chunks and add nothing to the ranking
+_STOPWORDS = frozenset("""
+    a an and are as at be been by can could did do does for from had has have how i in is it its me my
+    of on or our should that the their there these this those to was we were what when where which who
+    whom why will with would you your
+""".split())
+
+
+def _fold(text):
+    # Lowercase without accents, as the tokenizer indexes it (remove_diacritics)
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def query_phrases(query):
+    """
+    Token tuples for a free-text question: each whitespace-separated word
+    becomes one phrase, so an identifier such as "INV-2023-0042" only
+    matches those tokens in that order. Stopwords are dropped.
+    """
+    phrases = []
+    for word in query.split():
+        tokens = tuple(_TOKEN.findall(_fold(word)))
+        if not tokens or (len(tokens) == 1 and tokens[0] in _STOPWORDS):
+            continue
+        phrases.append(tokens)
+    return list(dict.fromkeys(phrases))
+
+
+def match_expression(phrases):
+    """FTS5 MATCH expression OR-ing the phrases, so BM25 ranks chunks by how many (and how rare) they contain."""
+    return " OR ".join('"' + " ".join(tokens) + '"' for tokens in phrases)
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over chunk text, kept in a SQLite FTS5 table next
+    to the Chroma store. It is updated in the same places as the collection
+    (ingest writes, deletes), so exact identifiers such as invoice numbers
+    and part codes can be found without re-scanning chunks.
+    """
+
+    def __init__(self, path=LEXICAL_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL UNIQUE,
+                source TEXT,
+                metadata TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source);
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                document, tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_vocab USING fts5vocab(chunks_fts, 'row');
+        """)
+        self._db.commit()
+
+    def _delete_where(self, column, values):
+        removed = 0
+        for i in range(0, len(values), _SQL_BATCH):
+            batch = values[i:i + _SQL_BATCH]
+            marks = ",".join("?" * len(batch))
+            rowids = [r[0] for r in self._db.execute(f"SELECT id FROM chunks WHERE {column} IN ({marks})", batch)]
+            if not rowids:
+                continue
+            marks = ",".join("?" * len(rowids))
+            self._db.execute(f"DELETE FROM chunks_fts WHERE rowid IN ({marks})", rowids)
+            self._db.execute(f"DELETE FROM chunks WHERE id IN ({marks})", rowids)
+            removed += len(rowids)
+        return removed
+
+    def upsert(self, ids, documents, metadatas):
+        """Indexes chunks; a chunk already indexed under the same id is replaced."""
+        if not ids:
+            return
+        with self._lock, self._db:
+            self._delete_where("chunk_id", list(ids))
+            for chunk_id, text, meta in zip(ids, documents, metadatas):
+                meta = meta or {}
+                rowid = self._db.execute(
+                    "INSERT INTO chunks (chunk_id, source, metadata) VALUES (?, ?, ?)",
+                    (chunk_id, meta.get("source"), json.dumps(meta))
+                ).lastrowid
+                self._db.execute("INSERT INTO chunks_fts (rowid, document) VALUES (?, ?)", (rowid, text or ""))
+
+    def update_metadata(self, ids, metadatas):
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE chunks SET source=?, metadata=? WHERE chunk_id=?",
+                [((meta or {}).get("source"), json.dumps(meta or {}), chunk_id) for chunk_id, meta in zip(ids, metadatas)]
+            )
+
+    def delete(self, ids):
+        with self._lock, self._db:
+            return self._delete_where("chunk_id", list(ids))
+
+    def delete_source(self, source):
+        with self._lock, self._db:
+            return self._delete_where("source", [source])
+
+    def _selective(self, phrases, max_df):
+        """
+        Drops phrases that cannot match, and phrases whose every token is in
+        more than `max_df` of the chunks: ranking has to score each chunk on
+        such a posting list, and their BM25 weight is small anyway.
+        """
+        terms = list({t for tokens in phrases for t in tokens})
+        marks = ",".join("?" * len(terms))
+        df = dict(self._db.execute(f"SELECT term, doc FROM chunks_vocab WHERE term IN ({marks})", terms))
+        total = self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        limit = max(max_df * total, _PRUNE_MIN_DF)
+        return [tokens for tokens in phrases if 0 < min(df.get(t, 0) for t in tokens) <= limit]
+
+    def search(self, query, k, max_df=LEXICAL_MAX_DF):
+        """[(chunk_id, text, metadata, bm25 score)] for the k best matches, best first."""
+        phrases = query_phrases(query)
+        if not phrases:
+            return []
+        with self._lock:
+            phrases = self._selective(phrases, max_df)
+            if not phrases:
+                return []
+            rows = self._db.execute(
+                """
+                SELECT c.chunk_id, f.document, c.metadata, -f.rank
+                FROM (SELECT rowid, document, rank FROM chunks_fts WHERE chunks_fts MATCH ? ORDER BY rank LIMIT ?) f
+                JOIN chunks c ON c.id = f.rowid
+                ORDER BY f.rank
+                """,
+                (match_expression(phrases), k)
+            ).fetchall()
+        return [(chunk_id, text, json.loads(meta or "{}"), score) for chunk_id, text, meta, score in rows]
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def export_from_collection(self, collection):
+        """Rebuilds the index from every chunk in the Chroma collection, paging through it."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM chunks")
+            self._db.execute("DELETE FROM chunks_fts")
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=_SCAN_PAGE, offset=offset)
+            if not page["ids"]:
+                break
+            self.upsert(page["ids"], page["documents"], page["metadatas"])
+            offset += len(page["ids"])
+        with self._lock, self._db:
+            self._db.execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('optimize')")
+        logger.info(f"lexical index exported: {offset} chunks")
+        return offset
+
+    def bootstrap(self, collection):
+        """Exports once if the index is empty but the collection is not."""
+        if self.count() == 0 and collection.count() > 0:
+            logger.info("lexical index empty but collection has chunks; exporting")
+            self.export_from_collection(collection)
+
+    def stats(self):
+        size = sum(os.path.getsize(p) for p in (self.path, f"{self.path}-wal") if os.path.exists(p))
+        return {"chunks": self.count(), "bytes": size}
+
+
+def reciprocal_rank_fusion(rankings, k, rrf_k=HYBRID_RRF_K):
+    """
+    Fuses ranked lists of (key, item) with reciprocal rank fusion: each
+    item scores sum(1 / (rrf_k + rank)) over the lists it appears in.
+    Returns the k best items; ties keep first-seen order.
+    """
+    scores, items = {}, {}
+    for ranking in rankings:
+        for rank, (key, item) in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            items.setdefault(key, item)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [items[key] for key in best]
+
+
+def doc_key(doc):
+    # Chroma results don't always carry ids, so match on where the text came from
+    return (doc.metadata.get("source"), doc.metadata.get("page"), doc.page_content)
+
+
+def hybrid_search(vectorstore, lexical, question, vector, k=RETRIEVER_K, fetch_k=HYBRID_FETCH_K, timer=None):
+    """Top-k Documents from vector search and BM25, each fetching fetch_k, fused by RRF."""
+    from langchain_core.documents import Document
+
+    stage = timer.stage if timer is not None else lambda name: nullcontext()
+    fetch_k = max(k, fetch_k)
+    with stage("search"):
+        dense = vectorstore.similarity_search_by_vector(vector, k=fetch_k)
+    with stage("lexical"):
+        sparse = [Document(page_content=text, metadata=meta) for _, text, meta, _ in lexical.search(question, fetch_k)]
+    with stage("fuse"):
+        return reciprocal_rank_fusion([[(doc_key(d), d) for d in dense], [(doc_key(d), d) for d in sparse]], k)
+
+
+class HybridRetriever:
+    """Exposes hybrid_search with the retriever surface modules.llm.retrieve uses."""
+
+    def __init__(self, vectorstore, lexical, k=RETRIEVER_K, fetch_k=HYBRID_FETCH_K):
+        self.vectorstore = vectorstore
+        self.lexical = lexical
+        self.search_kwargs = {"k": k}
+        self.fetch_k = fetch_k
+
+    def search(self, question, vector, timer=None):
+        return hybrid_search(self.vectorstore, self.lexical, question, vector, self.search_kwargs["k"], self.fetch_k, timer)
+
+    def invoke(self, question):
+        return self.search(question, self.vectorstore.embeddings.embed_query(question))
+
+
+if __name__ == "__main__":
+    # python -m modules.lexical_index export|stats [workspace]
+    from config import DEFAULT_WORKSPACE
+    from modules.workspaces import workspace_paths
+    command = sys.argv[1] if len(sys.argv) in (2, 3) else None
+    if command not in ("export", "stats"):
+        print("usage: python -m modules.lexical_index export|stats [workspace]")
+        sys.exit(1)
+    workspace = sys.argv[2] if len(sys.argv) == 3 else DEFAULT_WORKSPACE
+    index = LexicalIndex(workspace_paths(workspace).lexical_index)
+    if command == "export":
+        from modules.resources import registry
+        print(f"✅ Exported {index.export_from_collection(registry.collection(workspace))} chunks")
+    print(index.stats())
@@ -1,21 +1,15 @@
-from langchain_core.prompts import PromptTemplate
-from langchain_groq import ChatGroq
-import os
-from dotenv import load_dotenv
+import time
+from modules.resources import registry
+from modules.metrics import StageTimer, QUERY_STAGE_LATENCY, PROMPT_TOKENS
+from modules.context_packing import pack_context, count_tokens
+from modules.query_gate import query_gate, limited
+from modules.lexical_index import HybridRetriever
+from modules.retrieval import ShardedRetriever
+from logger import get_logger
 
-load_dotenv()
+logger = get_logger("query")
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-
-def get_llm_chain(retriever):
-    llm = ChatGroq(
-        groq_api_key=GROQ_API_KEY,
-        model_name="llama-3.3-70b-versatile"
-    )
-
-    prompt = PromptTemplate(
-        input_variables=["context", "question"],
-        template="""
+PROMPT_TEMPLATE = """
 You are a smart **Document Assistant**. Your job is to answer the user's question based **only** on the provided context.
 
 ---
@@ -30,28 +24,116 @@ You are a smart **Document Assistant**. Your job is to answer the user's questio
 1. If the answer is in the context, provide it clearly.
 2. If the context does not contain the answer, say "I couldn't find that information in the document."
 3. Do not make up information.
-""",
+"""
+
+_prompt = None
+
+def get_prompt():
+    # PromptTemplate pulls in langchain-core; build it on first use, not at import
+    global _prompt
+    if _prompt is None:
+        from langchain_core.prompts import PromptTemplate
+        _prompt = PromptTemplate(input_variables=["context", "question"], template=PROMPT_TEMPLATE)
+    return _prompt
+
+def build_prompt(question, docs):
+    context = "\n\n".join(doc.page_content for doc in docs)
+    return get_prompt().format(context=context, question=question)
+
+def retrieve(retriever, question, timer):
+    """
+    Runs retrieval, timing query embedding and vector search separately when
+    possible. Returns (docs, query vector or None).
+    """
+    vectorstore = getattr(retriever, "vectorstore", None)
+    if vectorstore is not None and hasattr(vectorstore, "similarity_search_by_vector"):
+        with limited(query_gate.embed_slots, timer, "embed"):
+            vector = vectorstore.embeddings.embed_query(question)
+        if isinstance(retriever, (HybridRetriever, ShardedRetriever)):
+            return retriever.search(question, vector, timer), vector
+        with timer.stage("search"):
+            return vectorstore.similarity_search_by_vector(vector, **retriever.search_kwargs), vector
+    with limited(query_gate.embed_slots, timer, "retrieve"):
+        return retriever.invoke(question), None
+
+def prepare_prompt(question, docs, query_vector, timer):
+    """
+    Packs the retrieved chunks into the context budget, then formats the
+    prompt. Returns (prompt, packed docs, packing stats with prompt token
+    counts before and after).
+    """
+    with timer.stage("pack"):
+        packed, stats = pack_context(docs, query_vector, embed=registry.embed_model())
+    with timer.stage("prompt"):
+        formatted_prompt = build_prompt(question, packed)
+    overhead = count_tokens(build_prompt(question, []))
+    stats["prompt_tokens_before"] = overhead + stats.pop("context_tokens_before")
+    stats["prompt_tokens_after"] = overhead + stats.pop("context_tokens_after")
+    PROMPT_TOKENS.observe(stats["prompt_tokens_before"], stage="before_packing")
+    PROMPT_TOKENS.observe(stats["prompt_tokens_after"], stage="after_packing")
+    logger.info(
+        f"context packed: {stats['chunks_before']} -> {stats['chunks_after']} chunks, "
+        f"prompt tokens {stats['prompt_tokens_before']} -> {stats['prompt_tokens_after']}"
     )
+    return formatted_prompt, packed, stats
+
+def get_llm_chain(retriever, llm=None):
+    # Reuse the process-wide client instead of building ChatGroq per question
+    if llm is None:
+        llm = registry.llm()
 
     # Custom chain wrapper to replace RetrievalQA and avoid langchain package dependency issues
     def run_chain(inputs):
         question = inputs["query"]
-        
+        timer = StageTimer(QUERY_STAGE_LATENCY)
+
         # 1. Retrieve documents
-        # retriever.invoke is the modern LCEL method (langchain-core)
-        docs = retriever.invoke(question)
-        
-        # 2. Format context
-        context = "\n\n".join(doc.page_content for doc in docs)
-        
+        docs, vector = retrieve(retriever, question, timer)
+
+        # 2. Pack and format context
+        formatted_prompt, docs, packing = prepare_prompt(question, docs, vector, timer)
+
         # 3. Generate answer
-        formatted_prompt = prompt.format(context=context, question=question)
-        response = llm.invoke(formatted_prompt)
-        
+        with limited(query_gate.llm_slots, timer, "llm"):
+            response = llm.invoke(formatted_prompt)
+        logger.info(f"query timings: {timer.summary()}")
+
         # 4. Return result in expected format
         return {
             "result": response.content,
-            "source_documents": docs
+            "source_documents": docs,
+            "context": packing
         }
 
     return run_chain
+
+def get_streaming_chain(retriever, llm=None):
+    """
+    Like get_llm_chain, but returns a generator function that yields
+    ("sources", docs) once retrieval is done and then ("token", text)
+    for each piece of the answer as the LLM produces it.
+    """
+    if llm is None:
+        llm = registry.llm()
+
+    def stream_chain(question):
+        start = time.perf_counter()
+        timer = StageTimer(QUERY_STAGE_LATENCY)
+        docs, vector = retrieve(retriever, question, timer)
+        formatted_prompt, docs, _ = prepare_prompt(question, docs, vector, timer)
+        yield "sources", docs
+
+        first_token_at = None
+        with limited(query_gate.llm_slots, timer, "llm"):
+            llm_start = time.perf_counter()
+            for chunk in llm.stream(formatted_prompt):
+                if not chunk.content:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    QUERY_STAGE_LATENCY.observe(first_token_at - llm_start, stage="llm_first_token")
+                    logger.info(f"time to first token: {first_token_at - start:.3f}s")
+                yield "token", chunk.content
+        logger.info(f"stream complete in {time.perf_counter() - start:.3f}s, timings: {timer.summary()}")
+
+    return stream_chain
@@ -0,0 +1,204 @@
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from types import SimpleNamespace
+
+from config import (
+    LLM_API_BASE, GROQ_API_KEY, LLM_MODEL_NAME, LLM_FALLBACK_MODEL, LLM_DEADLINE, LLM_FALLBACK_AFTER,
+    LLM_HEDGE_ENABLED, LLM_HEDGE_DELAY, LLM_HEDGE_MIN_DELAY, LLM_POOL_CONNECTIONS
+)
+from logger import get_logger
+from modules.metrics import LLM_REQUEST_LATENCY, LLM_REQUESTS, LLM_HEDGES, LLM_FALLBACKS
+
+logger = get_logger("llm")
+
+# Latency samples kept per model for the hedge delay, and how many before trusting p95
+_WINDOW = 200
+_MIN_SAMPLES = 20
+
+
+class LLMError(Exception):
+    """The upstream API failed or answered with an error status."""
+
+
+class LLMTimeoutError(LLMError):
+    """No answer arrived within the latency budget."""
+
+
+class PooledLLMClient:
+    """
+    Long-lived client for an OpenAI-compatible chat completions API (Groq
+    by default), with the same invoke()/stream() surface the chains use.
+
+    One pooled HTTP client keeps connections alive across questions. Every
+    call gets a deadline. A non-streaming call still unanswered after the
+    model's recent p95 latency is hedged with a duplicate request, and the
+    first answer wins. When the primary model errors or misses
+    `fallback_after`, the call moves to the smaller fallback model for the
+    rest of the deadline.
+    """
+
+    def __init__(self, api_base=LLM_API_BASE, api_key=GROQ_API_KEY, model=LLM_MODEL_NAME,
+                 fallback_model=LLM_FALLBACK_MODEL, deadline=LLM_DEADLINE, fallback_after=LLM_FALLBACK_AFTER,
+                 hedge=LLM_HEDGE_ENABLED, hedge_delay=LLM_HEDGE_DELAY, hedge_min_delay=LLM_HEDGE_MIN_DELAY,
+                 max_connections=LLM_POOL_CONNECTIONS):
+        import httpx
+
+        self.model = model
+        self.fallback_model = fallback_model or None
+        self.deadline = deadline
+        self.fallback_after = fallback_after
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_min_delay = hedge_min_delay
+        self._http = httpx.Client(
+            base_url=api_base.rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        # Requests outlive a lost race; they finish (or time out) here in the background
+        self._pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="llm")
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def _record(self, model, seconds, outcome):
+        LLM_REQUESTS.inc(model=model, outcome=outcome)
+        if outcome == "ok":
+            LLM_REQUEST_LATENCY.observe(seconds, model=model)
+            with self._lock:
+                self._latencies.setdefault(model, deque(maxlen=_WINDOW)).append(seconds)
+
+    def hedge_after(self, model):
+        """Seconds to wait before hedging: the model's recent p95, floored at hedge_min_delay."""
+        with self._lock:
+            samples = sorted(self._latencies.get(model, ()))
+        if len(samples) < _MIN_SAMPLES:
+            return self.hedge_delay
+        return max(self.hedge_min_delay, samples[int(len(samples) * 0.95) - 1])
+
+    def _timeout(self, until):
+        import httpx
+        remaining = max(0.001, until - time.monotonic())
+        return httpx.Timeout(remaining, connect=min(5.0, remaining))
+
+    def _payload(self, model, prompt, stream=False):
+        return {"model": model, "messages": [{"role": "user", "content": prompt}], "stream": stream}
+
+    def _check(self, response, model):
+        if response.status_code != 200:
+            raise LLMError(f"{model} returned HTTP {response.status_code}: {response.text[:200]}")
+
+    def _complete(self, model, prompt, until):
+        import httpx
+        start = time.monotonic()
+        try:
+            response = self._http.post("/chat/completions", json=self._payload(model, prompt), timeout=self._timeout(until))
+            self._check(response, model)
+            content = response.json()["choices"][0]["message"]["content"]
+        except httpx.TimeoutException as e:
+            self._record(model, time.monotonic() - start, "timeout")
+            raise LLMTimeoutError(f"{model} timed out") from e
+        except (httpx.HTTPError, LLMError, KeyError, ValueError) as e:
+            self._record(model, time.monotonic() - start, "error")
+            raise e if isinstance(e, LLMError) else LLMError(f"{model} request failed: {e}") from e
+        self._record(model, time.monotonic() - start, "ok")
+        return SimpleNamespace(content=content)
+
+    def _race(self, model, prompt, until, hedge):
+        """First successful answer from the request and, if it runs long, one hedged duplicate."""
+        pending = {self._pool.submit(self._complete, model, prompt, until)}
+        hedge_at = time.monotonic() + self.hedge_after(model) if hedge else None
+        last_error = None
+        while True:
+            now = time.monotonic()
+            if hedge_at is not None and now >= hedge_at:
+                LLM_HEDGES.inc(model=model)
+                logger.info(f"hedging {model} request after {self.hedge_after(model):.2f}s")
+                pending.add(self._pool.submit(self._complete, model, prompt, until))
+                hedge_at = None
+            if not pending:
+                raise last_error
+            if now >= until:
+                raise LLMTimeoutError(f"{model} gave no answer within {self.deadline}s budget")
+            done, pending = wait(pending, timeout=min(until, hedge_at or until) - now, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except LLMError as e:
+                    last_error = e
+            if last_error is not None and not pending and hedge_at is not None:
+                # The first request failed fast: spend the hedge on an immediate retry
+                hedge_at = time.monotonic()
+
+    def _attempts(self):
+        """(model, give-up time) pairs: the primary within fallback_after, then the fallback."""
+        deadline = time.monotonic() + self.deadline
+        if self.fallback_model is None:
+            return [(self.model, deadline)]
+        return [(self.model, min(deadline, time.monotonic() + self.fallback_after)), (self.fallback_model, deadline)]
+
+    def invoke(self, prompt):
+        attempts = self._attempts()
+        for i, (model, until) in enumerate(attempts):
+            try:
+                return self._race(model, prompt, until, hedge=self.hedge)
+            except LLMError as e:
+                if i == len(attempts) - 1 or time.monotonic() >= attempts[-1][1]:
+                    raise
+                LLM_FALLBACKS.inc(model=model)
+                logger.warning(f"{model} failed ({e}); falling back to {attempts[i + 1][0]}")
+
+    def _stream_once(self, model, prompt, until, deadline):
+        import httpx
+        start = time.monotonic()
+        first = True
+        try:
+            # Until the first token the budget is `until`; after that, the overall deadline
+            with self._http.stream(
+                "POST", "/chat/completions", json=self._payload(model, prompt, stream=True), timeout=self._timeout(until)
+            ) as response:
+                if response.status_code != 200:
+                    response.read()
+                    self._check(response, model)
+                for line in response.iter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    content = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if content:
+                        if time.monotonic() > (until if first else deadline):
+                            raise LLMTimeoutError(f"{model} stream exceeded its budget")
+                        first = False
+                        yield content
+        except httpx.TimeoutException as e:
+            self._record(model, time.monotonic() - start, "timeout")
+            raise LLMTimeoutError(f"{model} timed out") from e
+        except (httpx.HTTPError, LLMError, KeyError, ValueError) as e:
+            self._record(model, time.monotonic() - start, "timeout" if isinstance(e, LLMTimeoutError) else "error")
+            raise e if isinstance(e, LLMError) else LLMError(f"{model} stream failed: {e}") from e
+        self._record(model, time.monotonic() - start, "ok")
+
+    def stream(self, prompt):
+        """Streams the answer; falls back only if the primary fails before its first token."""
+        attempts = self._attempts()
+        deadline = attempts[-1][1]
+        for i, (model, until) in enumerate(attempts):
+            started = False
+            try:
+                for content in self._stream_once(model, prompt, until, deadline):
+                    started = True
+                    yield SimpleNamespace(content=content)
+                return
+            except LLMError as e:
+                if started or i == len(attempts) - 1 or time.monotonic() >= deadline:
+                    raise
+                LLM_FALLBACKS.inc(model=model)
+                logger.warning(f"{model} failed before first token ({e}); falling back to {attempts[i + 1][0]}")
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._http.close()
@@ -1,42 +1,61 @@
 import os
 import time
+import logging
+import hashlib
+import threading
+from itertools import islice
 from pathlib import Path
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain_core.documents import Document
-import pandas as pd
-from rapidocr_onnxruntime import RapidOCR
-from PIL import Image
-import fitz  # PyMuPDF
+from config import (
+    UPLOAD_DIR, PERSIST_DIR, DEFAULT_WORKSPACE, EMBED_BATCH_SIZE, WRITE_BATCH_SIZE, PIPELINE_QUEUE_SIZE,
+    INGEST_PART_DOCS
+)
+from modules.resources import registry
+from logger import get_logger
+from modules.pdf_extract import extract_pdf
+from modules.spreadsheet import extract_spreadsheet
+from modules.chunking import split_documents
+from modules.pdf_handlers import save_uploaded_files
+from modules.answer_cache import answer_cache
+from modules.workspaces import workspace_paths
+from modules.ingest_pipeline import run_pipeline
+from modules.metrics import (
+    INGEST_STAGE_LATENCY, EMBED_BATCH_LATENCY, DB_WRITE_LATENCY, INGEST_CHUNKS, INGEST_FILES
+)
 
 # Load environment variables
 load_dotenv()
 
-UPLOAD_DIR = "./uploaded_pdfs"
-PERSIST_DIR = "./chroma_db"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(PERSIST_DIR, exist_ok=True)
 
-# Initialize Embeddings
-embed_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+ingest_logger = get_logger("ingest")
 
-# Initialize OCR engine
-try:
-    ocr_engine = RapidOCR()
-    print("✅ OCR Engine initialized")
-except Exception as e:
-    print(f"⚠️ OCR Init Warning: {e}")
-    ocr_engine = None
+def log_msg(msg, level=logging.INFO):
+    # Goes through the shared queue-based logging pipeline (no file open per call)
+    ingest_logger.log(level, msg)
 
-def log_msg(msg):
-    with open("ingestion.log", "a", encoding="utf-8") as f:
-        f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} - {msg}\n")
-    print(msg)
+# OCR engine is created on the first image upload, not at import
+_ocr_engine = None
+_ocr_engine_lock = threading.Lock()
+_ocr_engine_failed = False
+
+def get_ocr_engine():
+    global _ocr_engine, _ocr_engine_failed
+    if _ocr_engine is None and not _ocr_engine_failed:
+        with _ocr_engine_lock:
+            if _ocr_engine is None and not _ocr_engine_failed:
+                try:
+                    from rapidocr_onnxruntime import RapidOCR
+                    _ocr_engine = RapidOCR()
+                    log_msg("✅ OCR Engine initialized")
+                except Exception as e:
+                    log_msg(f"⚠️ OCR Init Warning: {e}", logging.WARNING)
+                    _ocr_engine_failed = True
+    return _ocr_engine
 
 def extract_text_from_image(image_path):
+    ocr_engine = get_ocr_engine()
     if not ocr_engine:
         return "OCR Engine not available"
     try:
@@ -50,18 +69,18 @@ def extract_text_from_image(image_path):
         return ""
 
 def process_file(file_path):
+    from langchain_core.documents import Document
+
     ext = file_path.suffix.lower()
     docs = []
     
     # 1. Excel Files
     if ext in ['.xlsx', '.xls']:
-        try:
-            df = pd.read_excel(file_path)
-            text_data = df.to_string(index=False)
-            docs.append(Document(page_content=text_data, metadata={"source": str(file_path)}))
-            log_msg(f"📊 Processed Excel: {file_path}")
-        except Exception as e:
-            log_msg(f"❌ Error processing Excel {file_path}: {e}")
+        # Every sheet, in row groups that repeat the column headers. Returned
+        # as a lazy stream for the pipeline to read part by part; read errors
+        # surface there and fail the file.
+        log_msg(f"📊 Streaming Excel: {file_path}")
+        return extract_spreadsheet(file_path)
 
     # 2. Image Files
     elif ext in ['.png', '.jpg', '.jpeg']:
@@ -75,142 +94,367 @@ def process_file(file_path):
     # 3. PDF Files
     elif ext == '.pdf':
         try:
-            # First pass: Try standard text extraction
-            loader = PyPDFLoader(str(file_path))
-            pdf_docs = loader.load()
-            total_text_len = sum(len(d.page_content.strip()) for d in pdf_docs)
-            
-            # If text is sufficient, use it
-            if total_text_len >= 50:
-                docs.extend(pdf_docs)
-                log_msg(f"📄 Processed Text PDF: {file_path}")
+            # Single pass: per-page text, OCR only for low-text image pages
+            docs = extract_pdf(file_path)
+            ocr_pages = sum(1 for d in docs if d.metadata.get("extraction") == "ocr")
+            if docs:
+                log_msg(f"📄 Processed PDF: {file_path} ({len(docs)} pages, {ocr_pages} via OCR)")
             else:
-                log_msg(f"⚠️ Low text detected ({total_text_len} chars). Rasterizing PDF for OCR...")
-                
-                # Rasterize with PyMuPDF (Fitz)
-                try:
-                    doc = fitz.open(str(file_path))
-                    ocr_full_text = ""
-                    
-                    for page_num, page in enumerate(doc):
-                        # Render page to image (pixmap)
-                        pix = page.get_pixmap(dpi=300)
-                        img_bytes = pix.tobytes("png")
-                        
-                        if ocr_engine:
-                            result, _ = ocr_engine(img_bytes)
-                            if result:
-                                page_text = "\n".join([line[1] for line in result])
-                                ocr_full_text += page_text + "\n"
-                                log_msg(f"   - Page {page_num+1}: OCR Success")
-                            else:
-                                log_msg(f"   - Page {page_num+1}: No text found")
-                    
-                    doc.close()
-
-                    if ocr_full_text.strip():
-                        docs.append(Document(page_content=ocr_full_text, metadata={"source": str(file_path)}))
-                        log_msg(f"✅ OCR Extracted {len(ocr_full_text)} chars from scanned PDF")
-                    else:
-                        log_msg(f"❌ OCR found no text in {file_path}")
-
-                except Exception as e:
-                    log_msg(f"❌ PyMuPDF/OCR Error on {file_path}: {e}")
+                log_msg(f"❌ No text found in {file_path}")
 
         except Exception as e:
             log_msg(f"❌ Error processing PDF {file_path}: {e}")
             
     return docs
 
-def load_vectorstore(uploaded_files):
+def chunk_ids(doc_name, chunks, seen=None):
     """
-    Ingests files and returns a status dictionary.
+    Stable ids from the document name and chunk text, so an edited file keeps
+    the ids of every chunk whose text did not change. Repeated identical
+    chunks within a file are told apart by their occurrence count; pass the
+    same `seen` dict for every part of a file split into parts.
     """
-    file_paths = []
-    log_msg(f"🚀 Starting ingestion for {len(uploaded_files)} files")
-    
-    saved_files = []
-    for file in uploaded_files:
-        save_path = Path(UPLOAD_DIR) / file.filename
-        with open(save_path, "wb") as f:
-            f.write(file.file.read())
-        saved_files.append(save_path)
-        log_msg(f"💾 Saved file: {save_path}")
-
-    all_chunks = []
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-
-    processed_count = 0
+    seen = {} if seen is None else seen
+    ids = []
+    for chunk in chunks:
+        digest = hashlib.sha256(f"{doc_name}\x00{chunk.page_content}".encode("utf-8")).hexdigest()
+        seen[digest] = seen.get(digest, 0) + 1
+        ids.append(f"{digest[:32]}-{seen[digest]}")
+    return ids
+
+def _parts(documents, size):
+    """Yields (batch, is_last) over `documents` in batches of `size`, reading one batch ahead."""
+    documents = iter(documents)
+    batch = list(islice(documents, size))
+    while batch:
+        following = list(islice(documents, size))
+        yield batch, not following
+        batch = following
+
+def page_count(documents):
+    return (max(d.metadata.get("total_pages", 0) for d in documents)
+            or len({d.metadata.get("page", i) for i, d in enumerate(documents)}))
+
+def diff_chunks(ids, chunks, existing_ids):
+    """
+    Splits a file's chunks against the ids already indexed for it: new
+    chunks (to embed), unchanged ones (metadata refresh only) and stale ids
+    that are no longer produced (to delete).
+    """
+    new_chunks, new_ids, kept_ids, kept_metadatas = [], [], [], []
+    for chunk_id, chunk in zip(ids, chunks):
+        if chunk_id in existing_ids:
+            kept_ids.append(chunk_id)
+            kept_metadatas.append(chunk.metadata)
+        else:
+            new_ids.append(chunk_id)
+            new_chunks.append(chunk)
+    stale_ids = list(set(existing_ids) - set(ids))
+    return new_chunks, new_ids, kept_ids, kept_metadatas, stale_ids
+
+def write_chunks(workspace, new_ids, embeddings, new_chunks, kept_ids=(), kept_metadatas=(), stale_ids=(),
+                 batch_size=WRITE_BATCH_SIZE):
+    """Applies one diff to the workspace's collection and keeps its sidecar indexes in step."""
+    collection = registry.collection(workspace)
+    read_index = registry.read_index(workspace)
+    lexical_index = registry.lexical_index(workspace)
+    for i in range(0, len(new_ids), batch_size):
+        batch = slice(i, i + batch_size)
+        with DB_WRITE_LATENCY.time():
+            collection.upsert(
+                ids=new_ids[batch],
+                embeddings=embeddings[batch],
+                documents=[c.page_content for c in new_chunks[batch]],
+                metadatas=[c.metadata for c in new_chunks[batch]],
+            )
+    if kept_ids:
+        # Unchanged text keeps its vector; only metadata (hash, page) is refreshed
+        collection.update(ids=list(kept_ids), metadatas=list(kept_metadatas))
+    if stale_ids:
+        collection.delete(ids=list(stale_ids))
+    if read_index is not None:
+        # Keep the memory-mapped query index in step with the collection
+        read_index.append(new_ids, embeddings, [c.page_content for c in new_chunks], [c.metadata for c in new_chunks])
+        if kept_ids:
+            read_index.update_metadata(list(kept_ids), list(kept_metadatas))
+        if stale_ids:
+            read_index.delete(list(stale_ids))
+    if lexical_index is not None:
+        lexical_index.upsert(new_ids, [c.page_content for c in new_chunks], [c.metadata for c in new_chunks])
+        if kept_ids:
+            lexical_index.update_metadata(list(kept_ids), list(kept_metadatas))
+        if stale_ids:
+            lexical_index.delete(list(stale_ids))
+
+def delete_chunks(workspace, ids):
+    """Deletes chunks by id from the workspace's collection and its sidecar indexes."""
+    read_index = registry.read_index(workspace)
+    lexical_index = registry.lexical_index(workspace)
+    registry.collection(workspace).delete(ids=list(ids))
+    if read_index is not None:
+        read_index.delete(list(ids))
+    if lexical_index is not None:
+        lexical_index.delete(list(ids))
+
+def ingest_files(saved_files, progress=None, workspace=DEFAULT_WORKSPACE):
+    """
+    Extracts, splits and embeds files already saved on disk
+    (`SavedUpload` records from modules.pdf_handlers) into `workspace`.
+    `progress(filename, stage, **fields)` is called as each file moves through
+    the pipeline so background jobs can report per-file state.
+
+    Files stream through extract -> split -> embed -> write stages joined by
+    bounded queues, so file N+1 is extracted while file N is embedded and
+    each file is committed as soon as its own chunks are written. Within a
+    file, INGEST_PART_DOCS pages (or row groups) move on at a time, so a
+    large workbook streams through without being held in memory whole.
+    """
+    def report(name, stage, **fields):
+        if progress:
+            progress(name, stage, **fields)
+
+    log_msg(f"🚀 Starting ingestion for {len(saved_files)} files into workspace '{workspace}'")
+
+    collection = registry.collection(workspace)
+    embed_model = registry.embed_model()
+    catalog = registry.catalog(workspace)
+
+    lock = threading.Lock()
+    processed = []
     failed_files = []
+    totals = {"added": 0, "skipped": 0, "removed": 0}
 
-    for file_path in saved_files:
+    def extract(upload):
+        file_path = upload.path
+        # Same name, same bytes: the index already holds exactly this file
+        entry = catalog.get(file_path.name)
+        if entry and entry["file_hash"] == upload.sha256:
+            with lock:
+                processed.append(file_path.name)
+                totals["skipped"] += entry["chunk_count"]
+            report(file_path.name, "done", chunks=entry["chunk_count"], chunks_skipped=entry["chunk_count"], chunks_added=0, chunks_removed=0)
+            INGEST_FILES.inc(outcome="unchanged")
+            log_msg(f"⏭️ {file_path.name} unchanged, skipping ({entry['chunk_count']} chunks)")
+            return None
+
+        report(file_path.name, "extracting")
+        t0 = time.perf_counter()
+        # A list of pages, or a lazy stream of row groups for spreadsheets
         documents = process_file(file_path)
-        if documents:
-            chunks = splitter.split_documents(documents)
-            all_chunks.extend(chunks)
-            processed_count += 1
-            log_msg(f"🧩 Split {file_path.name} into {len(chunks)} chunks")
+        extract_s = time.perf_counter() - t0
+        INGEST_STAGE_LATENCY.observe(extract_s, stage="extract")
+        if not documents:
+            return empty_file(file_path.name, extract_s=extract_s)
+        report(file_path.name, "splitting", extract_s=extract_s)
+        # Per-file state, shared by every part of the file as it moves down the pipeline
+        # write_lock keeps a part's write and the file's rollback from interleaving
+        return {
+            "upload": upload, "entry": entry, "source": str(file_path), "documents": documents,
+            "failed": False, "write_lock": threading.Lock(),
+        }
+
+    def empty_file(name, **fields):
+        with lock:
+            failed_files.append(name)
+        INGEST_FILES.inc(outcome="empty")
+        report(name, "failed", error="No content extracted", **fields)
+        log_msg(f"⚠️ Skipping {name} (No content extracted)")
+
+    def split(state):
+        upload = state["upload"]
+        name = upload.path.name
+        documents = state.pop("documents")
+
+        # Diff against what is indexed for this file: only new text gets embedded
+        if state["entry"]:
+            existing_ids = set(catalog.chunk_ids(name))
         else:
-            failed_files.append(file_path.name)
-            log_msg(f"⚠️ Skipping {file_path.name} (No content extracted)")
-
-    if all_chunks:
-        log_msg(f"🔍 Embedding {len(all_chunks)} chunks...")
-        vectorstore = Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=embed_model,
-            collection_name="rag_app"
+            # Not catalogued (e.g. indexed before the catalog existed)
+            existing_ids = set(collection.get(where={"source": state["source"]}, include=[])["ids"])
+        state.update(
+            existing_ids=existing_ids, ids=[], written=[], seen={}, pages=set(), total_pages=0, documents=0, added=0, kept=0
         )
-        vectorstore.add_documents(documents=all_chunks)
-        log_msg(f"✅ SUCCESS: Saved {len(all_chunks)} chunks to {PERSIST_DIR}")
-        return {"status": "success", "processed": processed_count, "failed": failed_files}
-    else:
+
+        # The file moves on in parts, so a large workbook is never held in memory whole
+        for batch, last in _parts(documents, INGEST_PART_DOCS):
+            if state["failed"]:
+                return
+            t0 = time.perf_counter()
+            # Per-page, token-sized chunks with source/page/offset provenance
+            chunks = split_documents(batch)
+            for chunk in chunks:
+                chunk.metadata["file_hash"] = upload.sha256
+            ids = chunk_ids(name, chunks, state["seen"])
+            state["ids"].extend(ids)
+            for doc in batch:
+                state["pages"].add(doc.metadata.get("page", state["documents"]))
+                state["total_pages"] = max(state["total_pages"], doc.metadata.get("total_pages", 0))
+                state["documents"] += 1
+
+            new_chunks, new_ids, kept_ids, kept_metadatas, _ = diff_chunks(ids, chunks, existing_ids)
+            # Stale ids are only known once every part has been split
+            stale_ids = list(existing_ids - set(state["ids"])) if last else []
+            split_s = time.perf_counter() - t0
+            INGEST_STAGE_LATENCY.observe(split_s, stage="split")
+            report(name, "embedding", chunks=len(state["ids"]), split_s=split_s)
+            if last:
+                log_msg(f"🧩 Split {name} into {len(state['ids'])} chunks ({len(stale_ids)} stale)")
+            yield {
+                "file": state, "new_chunks": new_chunks, "new_ids": new_ids, "kept_ids": kept_ids,
+                "kept_metadatas": kept_metadatas, "stale_ids": stale_ids, "last": last,
+            }
+        if not state["documents"]:
+            empty_file(name)
+
+    def embed(part):
+        if part["file"]["failed"]:
+            return None
+        t0 = time.perf_counter()
+        texts = [chunk.page_content for chunk in part["new_chunks"]]
+        embeddings = []
+        for i in range(0, len(texts), EMBED_BATCH_SIZE):
+            with EMBED_BATCH_LATENCY.time():
+                embeddings.extend(embed_model.embed_documents(texts[i:i + EMBED_BATCH_SIZE]))
+        part["embeddings"] = embeddings
+        embed_s = time.perf_counter() - t0
+        INGEST_STAGE_LATENCY.observe(embed_s, stage="embed")
+        report(part["file"]["upload"].path.name, "writing", embed_s=embed_s)
+        return part
+
+    def write(part):
+        state = part["file"]
+        # Split runs in another thread and may fail the file at any moment:
+        # either this part is written before the rollback, or not at all
+        with state["write_lock"]:
+            if not state["failed"]:
+                write_part(part)
+
+    def write_part(part):
+        state = part["file"]
+        upload = state["upload"]
+        name = upload.path.name
+        t0 = time.perf_counter()
+        new_ids = part["new_ids"]
+        # Recorded before writing, so a failure part-way through is rolled back too
+        state["written"].extend(new_ids)
+        write_chunks(
+            workspace, new_ids, part["embeddings"], part["new_chunks"],
+            part["kept_ids"], part["kept_metadatas"], part["stale_ids"]
+        )
+        if new_ids or part["stale_ids"]:
+            answer_cache.invalidate(workspace)
+        state["added"] += len(new_ids)
+        state["kept"] += len(part["kept_ids"])
+        INGEST_CHUNKS.inc(len(new_ids), outcome="added")
+        INGEST_CHUNKS.inc(len(part["kept_ids"]), outcome="unchanged")
+        INGEST_CHUNKS.inc(len(part["stale_ids"]), outcome="removed")
+        if part["last"]:
+            pages = state["total_pages"] or len(state["pages"])
+            catalog.upsert_document(name, state["source"], upload.sha256, upload.size, pages, state["ids"])
+            with lock:
+                processed.append(name)
+                totals["added"] += state["added"]
+                totals["skipped"] += state["kept"]
+                totals["removed"] += len(part["stale_ids"])
+            INGEST_FILES.inc(outcome="ingested")
+        write_s = time.perf_counter() - t0
+        INGEST_STAGE_LATENCY.observe(write_s, stage="write")
+        if part["last"]:
+            report(
+                name, "done", chunks_added=state["added"], chunks_skipped=state["kept"],
+                chunks_removed=len(part["stale_ids"]), write_s=write_s
+            )
+            log_msg(f"✅ Committed {name}: {state['added']} added, {state['kept']} kept, {len(part['stale_ids'])} removed")
+
+    def rollback(state):
+        # Earlier parts may already be written. The catalog still lists the
+        # file's previous ids, so delete_document would never reach the new
+        # ones: remove them now. Ids the file had before are left alone.
+        written = state.get("written")
+        if not written:
+            return
+        try:
+            delete_chunks(workspace, written)
+            answer_cache.invalidate(workspace)
+            log_msg(f"↩️ Rolled back {len(written)} chunks written for {state['upload'].path.name}")
+        except Exception as e:
+            log_msg(f"❌ Rollback failed for {state['upload'].path.name}: {e}", logging.ERROR)
+
+    def on_error(item, stage, exc):
+        # An upload (extract), a file's state (split) or one part of a file (embed, write)
+        state = item.get("file", item) if isinstance(item, dict) else None
+        upload = state["upload"] if state is not None else item
+        with lock:
+            if state is not None:
+                if state["failed"]:
+                    return
+                # Later parts of the file are dropped
+                state["failed"] = True
+            failed_files.append(upload.path.name)
+        if state is not None:
+            with state["write_lock"]:
+                rollback(state)
+        INGEST_FILES.inc(outcome="failed")
+        report(upload.path.name, "failed", error=f"{stage} failed: {exc}")
+        log_msg(f"❌ {stage} failed for {upload.path.name}: {exc}")
+
+    run_pipeline(
+        saved_files,
+        [("extract", extract), ("split", split), ("embed", embed)],
+        write,
+        on_error,
+        queue_size=PIPELINE_QUEUE_SIZE,
+    )
+
+    if not processed:
         log_msg("⚠️ FAIL: No valid text extracted from any file.")
-        return {"status": "error", "processed": 0, "failed": failed_files}
+        return {"status": "error", "processed": 0, "failed": failed_files, **totals}
+
+    log_msg(f"✅ SUCCESS: {totals['added']} added, {totals['skipped']} skipped, {totals['removed']} removed in {PERSIST_DIR} ({workspace})")
+    return {"status": "success", "processed": len(processed), "failed": failed_files, **totals}
 
-def get_all_documents():
-    """Returns a list of unique filenames in the vectorstore."""
+def load_vectorstore(uploaded_files, workspace=DEFAULT_WORKSPACE):
+    """
+    Ingests files and returns a status dictionary.
+    """
+    saved_files = save_uploaded_files(uploaded_files, workspace_paths(workspace).upload_dir)
+    return ingest_files(saved_files, workspace=workspace)
+
+def get_all_documents(workspace=DEFAULT_WORKSPACE):
+    """Returns the filenames of all ingested documents in a workspace, from its catalog."""
     try:
-        if not os.path.exists(PERSIST_DIR):
-            return []
-        vectorstore = Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=embed_model,
-            collection_name="rag_app"
-        )
-        data = vectorstore.get()
-        if not data or not data['metadatas']:
-            return []
-        sources = set()
-        for meta in data['metadatas']:
-            if meta and 'source' in meta:
-                sources.add(os.path.basename(meta['source']))
-        return list(sources)
+        return [doc["name"] for doc in registry.catalog(workspace).list_documents()]
     except Exception as e:
         log_msg(f"❌ Error listing documents: {e}")
         return []
 
-def delete_document(filename):
-    """Deletes a document from vectorstore and disk."""
+def delete_document(filename, workspace=DEFAULT_WORKSPACE):
+    """Deletes a document from a workspace's vectorstore and from disk."""
     try:
-        vectorstore = Chroma(
-            persist_directory=PERSIST_DIR,
-            embedding_function=embed_model,
-            collection_name="rag_app"
-        )
-        file_path = Path(UPLOAD_DIR) / filename
-        data = vectorstore.get()
-        ids_to_delete = []
-        for i, meta in enumerate(data['metadatas']):
-            if meta and 'source' in meta:
-                if os.path.basename(meta['source']) == filename:
-                    ids_to_delete.append(data['ids'][i])
-        
+        collection = registry.collection(workspace)
+        catalog = registry.catalog(workspace)
+        read_index = registry.read_index(workspace)
+        lexical_index = registry.lexical_index(workspace)
+        upload_dir = Path(workspace_paths(workspace).upload_dir)
+        file_path = upload_dir / filename
+        ids_to_delete = catalog.chunk_ids(filename)
+
         if ids_to_delete:
-            vectorstore.delete(ids=ids_to_delete)
+            delete_chunks(workspace, ids_to_delete)
             log_msg(f"🗑️ Deleted {len(ids_to_delete)} chunks for {filename} from DB")
+        else:
+            # Not catalogued: fall back to a targeted metadata delete
+            collection.delete(where={"source": str(file_path)})
+            if read_index is not None:
+                read_index.delete_source(str(file_path))
+            if lexical_index is not None:
+                lexical_index.delete_source(str(file_path))
+            log_msg(f"🗑️ Deleted chunks for {filename} from DB by source")
+        catalog.remove_document(filename)
+        answer_cache.invalidate(workspace)
         
-        if file_path.exists():
+        # Bulk-ingested files are indexed in place; only uploads are removed from disk
+        if file_path.resolve().parent == upload_dir.resolve() and file_path.exists():
             os.remove(file_path)
             log_msg(f"🗑️ Deleted file {filename} from disk")
             
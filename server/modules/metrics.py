@@ -0,0 +1,144 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow OCR/LLM calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_label_str(names, key + (bound,))} {count}")
+                lines.append(f"{self.name}_bucket{_label_str(names, key + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.labels, key)} {series[-1]}")
+        return lines
+
+
+_metrics = []
+
+
+def counter(name, help, labels=()):
+    metric = Counter(name, help, labels)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    metric = Histogram(name, help, labels, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def render_metrics():
+    """All registered metrics in Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Collects per-stage durations for one request and feeds them to a histogram."""
+
+    def __init__(self, hist):
+        self.hist = hist
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0) + elapsed
+            self.hist.observe(elapsed, stage=name)
+
+    def summary(self):
+        return " ".join(f"{name}={value * 1000:.1f}ms" for name, value in self.timings.items())
+
+
+# HTTP
+HTTP_REQUESTS = counter("rag_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_LATENCY = histogram("rag_http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+
+# Query path
+QUERY_STAGE_LATENCY = histogram("rag_query_stage_seconds", "Latency of /ask/ stages (embed, search, prompt, llm)", ("stage",))
+LLM_REQUESTS = counter("rag_llm_requests_total", "Upstream LLM requests by model and outcome", ("model", "outcome"))
+LLM_REQUEST_LATENCY = histogram("rag_llm_request_seconds", "Latency of successful upstream LLM requests", ("model",))
+LLM_HEDGES = counter("rag_llm_hedges_total", "Hedged duplicate LLM requests", ("model",))
+LLM_FALLBACKS = counter("rag_llm_fallbacks_total", "Calls moved off a model to the fallback model", ("model",))
+PROMPT_TOKENS = histogram(
+    "rag_prompt_tokens", "Prompt tokens per question before and after context packing", ("stage",),
+    buckets=(128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)
+)
+QUERY_ADMISSIONS = counter("rag_query_admissions_total", "Questions admitted, coalesced or rejected", ("outcome",))
+
+# Ingestion path
+INGEST_STAGE_LATENCY = histogram("rag_ingest_stage_seconds", "Per-file ingestion stage latency", ("stage",))
+OCR_PAGE_LATENCY = histogram("rag_ocr_page_seconds", "Render + OCR time per page")
+EMBED_BATCH_LATENCY = histogram("rag_embed_batch_seconds", "Latency of one embedding batch during ingestion")
+DB_WRITE_LATENCY = histogram("rag_db_write_seconds", "Latency of one Chroma write batch")
+INGEST_CHUNKS = counter("rag_ingest_chunks_total", "Chunks processed during ingestion by outcome", ("outcome",))
+INGEST_FILES = counter("rag_ingest_files_total", "Files processed during ingestion by outcome", ("outcome",))
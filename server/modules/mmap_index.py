@@ -0,0 +1,458 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from config import (
+    MMAP_INDEX_DIR, MMAP_INDEX_DTYPE, MMAP_INDEX_MODE, MMAP_INDEX_NPROBE, MMAP_INDEX_TRAIN_MIN_ROWS
+)
+from logger import get_logger
+
+logger = get_logger("index")
+
+# Rows scored per block; bounds the float32 working copy of a float16 matrix
+_BLOCK_ROWS = 65536
+# Rows fetched per page when exporting from the Chroma collection
+_SCAN_PAGE = 5000
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+
+def _normalize(vectors):
+    import numpy as np
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def _top_k(scores, k):
+    """Indices of the k highest scores, best first."""
+    import numpy as np
+    if len(scores) > k:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def _assign(vectors, centroids):
+    """Nearest centroid (by cosine) for each unit vector, in blocks."""
+    import numpy as np
+    out = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), 8192):
+        block = np.asarray(vectors[start:start + 8192], dtype=np.float32)
+        out[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+class MmapVectorIndex:
+    """
+    Read-optimized copy of the Chroma collection for the query path: one
+    append-only matrix of unit-normalized vectors, memory-mapped read-only,
+    plus a SQLite sidecar holding each row's chunk id, text, metadata and
+    tombstone flag.
+
+    Every uvicorn worker maps the same file, so the vectors sit once in the
+    OS page cache instead of once per process. Writers append rows and
+    tombstone replaced or deleted ones under SQLite's write lock and bump a
+    version; readers see the new version on their next search and remap.
+    Tombstoned rows stay on disk until the next export.
+    """
+
+    def __init__(self, path=MMAP_INDEX_DIR, dtype=MMAP_INDEX_DTYPE):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(path, "rows.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (
+                row INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL,
+                source TEXT,
+                document TEXT,
+                metadata TEXT,
+                list INTEGER,
+                deleted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_rows_chunk ON rows(chunk_id);
+            CREATE INDEX IF NOT EXISTS idx_rows_source ON rows(source);
+            CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self._db.executemany(
+            "INSERT OR IGNORE INTO info (key, value) VALUES (?, ?)",
+            [("version", "0"), ("dtype", dtype), ("vectors_file", "vectors-0.bin")]
+        )
+        info = self._info()
+        # The dtype an index was created with wins over the current setting
+        self.dtype = info["dtype"]
+        open(os.path.join(path, info["vectors_file"]), "ab").close()
+        self._state = None
+
+    def _info(self):
+        return dict(self._db.execute("SELECT key, value FROM info"))
+
+    def _set_info(self, **values):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+            [(k, None if v is None else str(v)) for k, v in values.items()]
+        )
+
+    def _bump_version(self):
+        self._db.execute("UPDATE info SET value = CAST(value AS INTEGER) + 1 WHERE key='version'")
+
+    def _row_count(self):
+        return self._db.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM rows").fetchone()[0]
+
+    def _load_centroids(self, info):
+        import numpy as np
+        if not info.get("centroids_file"):
+            return None
+        return np.load(os.path.join(self.path, info["centroids_file"]))
+
+    def _write_transaction(self, work):
+        """Runs `work()` holding both the thread lock and SQLite's cross-process write lock."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = work()
+                self._db.execute("COMMIT")
+                return result
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _tombstone(self, column, values):
+        removed = 0
+        for i in range(0, len(values), _SQL_BATCH):
+            batch = values[i:i + _SQL_BATCH]
+            marks = ",".join("?" * len(batch))
+            removed += self._db.execute(
+                f"UPDATE rows SET deleted=1 WHERE deleted=0 AND {column} IN ({marks})", batch
+            ).rowcount
+        return removed
+
+    def append(self, ids, embeddings, documents, metadatas):
+        """Adds rows; a live row with the same chunk id is tombstoned and replaced."""
+        import numpy as np
+        if not ids:
+            return 0
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+
+        def work():
+            info = self._info()
+            if info.get("dim") is None:
+                self._set_info(dim=vectors.shape[1])
+            elif int(info["dim"]) != vectors.shape[1]:
+                raise ValueError(f"index holds {info['dim']}-d vectors, got {vectors.shape[1]}-d")
+            centroids = self._load_centroids(info)
+            lists = _assign(vectors, centroids).tolist() if centroids is not None else [None] * len(ids)
+
+            self._tombstone("chunk_id", list(ids))
+            count = self._row_count()
+            row_bytes = vectors.shape[1] * np.dtype(self.dtype).itemsize
+            with open(os.path.join(self.path, info["vectors_file"]), "r+b") as f:
+                # Anything past the committed rows is a torn write from a crashed append
+                f.seek(count * row_bytes)
+                f.write(vectors.astype(self.dtype).tobytes())
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+            self._db.executemany(
+                "INSERT INTO rows (row, chunk_id, source, document, metadata, list) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (count + i, chunk_id, (meta or {}).get("source"), text, json.dumps(meta or {}), lst)
+                    for i, (chunk_id, text, meta, lst) in enumerate(zip(ids, documents, metadatas, lists))
+                ]
+            )
+            self._bump_version()
+            return len(ids)
+
+        return self._write_transaction(work)
+
+    def update_metadata(self, ids, metadatas):
+        """Refreshes metadata of live rows in place; vectors are untouched."""
+        self._write_transaction(lambda: self._db.executemany(
+            "UPDATE rows SET metadata=?, source=? WHERE chunk_id=? AND deleted=0",
+            [(json.dumps(meta or {}), (meta or {}).get("source"), chunk_id) for chunk_id, meta in zip(ids, metadatas)]
+        ))
+
+    def delete(self, ids):
+        """Tombstones rows by chunk id. Returns the number of rows removed."""
+        def work():
+            removed = self._tombstone("chunk_id", list(ids))
+            self._bump_version()
+            return removed
+        return self._write_transaction(work)
+
+    def delete_source(self, source):
+        """Tombstones every row from one source file."""
+        def work():
+            removed = self._tombstone("source", [source])
+            self._bump_version()
+            return removed
+        return self._write_transaction(work)
+
+    def _refresh(self):
+        """Current snapshot of the index, remapped if another writer changed it."""
+        import numpy as np
+        with self._lock:
+            version = self._db.execute("SELECT value FROM info WHERE key='version'").fetchone()[0]
+            if self._state is not None and self._state["version"] == version:
+                return self._state
+            info = self._info()
+            count = self._row_count()
+            dim = int(info["dim"]) if info.get("dim") else 0
+            matrix = None
+            if count and dim:
+                matrix = np.memmap(
+                    os.path.join(self.path, info["vectors_file"]), dtype=self.dtype, mode="r", shape=(count, dim)
+                )
+            alive = np.ones(count, dtype=bool)
+            dead = [r for (r,) in self._db.execute("SELECT row FROM rows WHERE deleted=1")]
+            alive[dead] = False
+
+            centroids = self._load_centroids(info)
+            order = bounds = None
+            if centroids is not None:
+                lists = np.fromiter(
+                    (-1 if lst is None else lst for (lst,) in self._db.execute("SELECT list FROM rows ORDER BY row")),
+                    dtype=np.int32, count=count
+                )
+                # Rows grouped by list: list j occupies order[bounds[j + 1]:bounds[j + 2]], unassigned first
+                order = np.argsort(lists, kind="stable")
+                bounds = np.searchsorted(lists[order], np.arange(-1, len(centroids) + 1))
+            self._state = {
+                "version": version, "count": count, "dim": dim, "matrix": matrix, "alive": alive,
+                "centroids": centroids, "order": order, "bounds": bounds, "vectors_file": info["vectors_file"],
+            }
+            return self._state
+
+    def _score_rows(self, state, query, rows, k):
+        import numpy as np
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(rows), _BLOCK_ROWS):
+            block_rows = rows[start:start + _BLOCK_ROWS]
+            scores = np.asarray(state["matrix"][block_rows], dtype=np.float32) @ query
+            top = _top_k(scores, k)
+            best_rows = np.concatenate([best_rows, block_rows[top]])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            keep = _top_k(best_scores, k)
+            best_rows, best_scores = best_rows[keep], best_scores[keep]
+        return best_rows, best_scores
+
+    def _search_exact(self, state, query, k):
+        import numpy as np
+        matrix, alive = state["matrix"], state["alive"]
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, state["count"], _BLOCK_ROWS):
+            # Contiguous slices read straight from the mapping, no fancy indexing
+            scores = np.asarray(matrix[start:start + _BLOCK_ROWS], dtype=np.float32) @ query
+            scores[~alive[start:start + len(scores)]] = -np.inf
+            top = _top_k(scores, k)
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            keep = _top_k(best_scores, k)
+            best_rows, best_scores = best_rows[keep], best_scores[keep]
+        live = np.isfinite(best_scores)
+        return best_rows[live], best_scores[live]
+
+    def _search_approx(self, state, query, k, nprobe):
+        import numpy as np
+        order, bounds = state["order"], state["bounds"]
+        probes = _top_k(state["centroids"] @ query, nprobe)
+        # Unassigned rows (appended before training) are always candidates
+        parts = [order[bounds[0]:bounds[1]]] + [order[bounds[p + 1]:bounds[p + 2]] for p in probes]
+        rows = np.sort(np.concatenate(parts))
+        rows = rows[state["alive"][rows]]
+        return self._score_rows(state, query, rows, k)
+
+    def search(self, vector, k, mode=MMAP_INDEX_MODE, nprobe=MMAP_INDEX_NPROBE):
+        """Top-k live rows by cosine similarity as [(chunk_id, document, metadata, score)]."""
+        import numpy as np
+        state = self._refresh()
+        if state["matrix"] is None or k <= 0:
+            return []
+        query = _normalize(np.asarray(vector, dtype=np.float32)[None, :])[0]
+        if mode == "approx" and state["centroids"] is not None:
+            rows, scores = self._search_approx(state, query, k, nprobe)
+        else:
+            rows, scores = self._search_exact(state, query, k)
+        return self._fetch(rows.tolist(), scores.tolist())
+
+    def _fetch(self, rows, scores):
+        if not rows:
+            return []
+        marks = ",".join("?" * len(rows))
+        with self._lock:
+            found = {
+                r[0]: r[1:] for r in self._db.execute(
+                    f"SELECT row, chunk_id, document, metadata FROM rows WHERE row IN ({marks})", rows
+                )
+            }
+        return [
+            (found[row][0], found[row][1], json.loads(found[row][2]), score)
+            for row, score in zip(rows, scores) if row in found
+        ]
+
+    def count(self):
+        """Number of live rows."""
+        return int(self._refresh()["alive"].sum())
+
+    def train(self, nlist=None, iterations=10, sample=50000, seed=0):
+        """
+        Clusters live vectors with spherical k-means into `nlist` lists
+        (default sqrt of the row count) and assigns every row to one, which
+        enables approximate search. Later appends are assigned on write.
+        """
+        import numpy as np
+        state = self._refresh()
+        live_rows = np.flatnonzero(state["alive"])
+        if len(live_rows) == 0:
+            return 0
+        nlist = min(nlist or max(1, int(np.sqrt(len(live_rows)))), len(live_rows))
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(live_rows, min(sample, len(live_rows)), replace=False))
+        data = np.asarray(state["matrix"][sample_rows], dtype=np.float32)
+        centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = _assign(data, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            filled = np.bincount(assign, minlength=nlist) > 0
+            centroids[filled] = _normalize(sums[filled])
+
+        def work():
+            info = self._info()
+            name = f"centroids-{int(time.time() * 1000)}.npy"
+            np.save(os.path.join(self.path, name), centroids)
+            count = self._row_count()
+            matrix = np.memmap(
+                os.path.join(self.path, info["vectors_file"]), dtype=self.dtype, mode="r", shape=(count, int(info["dim"]))
+            )
+            lists = _assign(matrix, centroids)
+            self._db.executemany("UPDATE rows SET list=? WHERE row=?", zip(lists.tolist(), range(count)))
+            self._set_info(centroids_file=name)
+            self._bump_version()
+            return info.get("centroids_file")
+
+        old = self._write_transaction(work)
+        if old:
+            try:
+                os.remove(os.path.join(self.path, old))
+            except OSError:
+                pass
+        logger.info(f"read index trained: {nlist} lists over {len(live_rows)} rows")
+        return nlist
+
+    def export_from_collection(self, collection):
+        """
+        Rebuilds the index from every chunk in the Chroma collection, paging
+        through it. Drops tombstones and clustering; queries served while it
+        runs see a partial index.
+        """
+        def reset():
+            info = self._info()
+            name = f"vectors-{int(time.time() * 1000)}.bin"
+            open(os.path.join(self.path, name), "wb").close()
+            self._db.execute("DELETE FROM rows")
+            self._set_info(vectors_file=name, centroids_file=None, dim=None)
+            self._bump_version()
+            return [info["vectors_file"], info.get("centroids_file")]
+
+        # Readers still mapping the old files keep them until they remap
+        for old in filter(None, self._write_transaction(reset)):
+            try:
+                os.remove(os.path.join(self.path, old))
+            except OSError:
+                pass
+
+        offset = 0
+        while True:
+            page = collection.get(include=["embeddings", "documents", "metadatas"], limit=_SCAN_PAGE, offset=offset)
+            if not page["ids"]:
+                break
+            self.append(page["ids"], page["embeddings"], page["documents"], page["metadatas"])
+            offset += len(page["ids"])
+        logger.info(f"read index exported: {offset} chunks")
+        return offset
+
+    def bootstrap(self, collection, mode=MMAP_INDEX_MODE):
+        """Exports once if the index is empty; clusters it when approximate mode needs lists."""
+        if self.count() == 0 and collection.count() > 0:
+            logger.info("read index empty but collection has chunks; exporting")
+            self.export_from_collection(collection)
+        state = self._refresh()
+        if mode == "approx" and state["centroids"] is None and self.count() >= MMAP_INDEX_TRAIN_MIN_ROWS:
+            self.train()
+
+    def stats(self):
+        state = self._refresh()
+        path = os.path.join(self.path, state["vectors_file"])
+        return {
+            "rows": state["count"],
+            "live": int(state["alive"].sum()),
+            "tombstones": int(state["count"] - state["alive"].sum()),
+            "dim": state["dim"],
+            "dtype": self.dtype,
+            "bytes": os.path.getsize(path) if os.path.exists(path) else 0,
+            "lists": None if state["centroids"] is None else len(state["centroids"]),
+        }
+
+
+class MmapVectorStore:
+    """Pairs the index with the embedder; exposes what modules.llm.retrieve uses of a Chroma store."""
+
+    def __init__(self, index, embeddings):
+        self.index = index
+        self.embeddings = embeddings
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        from langchain_core.documents import Document
+        return [
+            Document(page_content=text, metadata=meta)
+            for _, text, meta, _ in self.index.search(embedding, k)
+        ]
+
+    def similarity_search_by_vector_with_relevance_scores(self, embedding, k=4, **kwargs):
+        """(Document, cosine distance) pairs, lower is closer, like Chroma's."""
+        from langchain_core.documents import Document
+        return [
+            (Document(page_content=text, metadata=meta), 1.0 - score)
+            for _, text, meta, score in self.index.search(embedding, k)
+        ]
+
+    def as_retriever(self, search_kwargs=None, **kwargs):
+        return IndexRetriever(self, search_kwargs or {})
+
+
+class IndexRetriever:
+    def __init__(self, vectorstore, search_kwargs):
+        self.vectorstore = vectorstore
+        self.search_kwargs = search_kwargs
+
+    def invoke(self, question):
+        vector = self.vectorstore.embeddings.embed_query(question)
+        return self.vectorstore.similarity_search_by_vector(vector, **self.search_kwargs)
+
+
+if __name__ == "__main__":
+    # python -m modules.mmap_index export|train|stats [workspace]
+    from config import DEFAULT_WORKSPACE
+    from modules.workspaces import workspace_paths
+    command = sys.argv[1] if len(sys.argv) in (2, 3) else None
+    if command not in ("export", "train", "stats"):
+        print("usage: python -m modules.mmap_index export|train|stats [workspace]")
+        sys.exit(1)
+    workspace = sys.argv[2] if len(sys.argv) == 3 else DEFAULT_WORKSPACE
+    index = MmapVectorIndex(workspace_paths(workspace).read_index)
+    if command == "export":
+        from modules.resources import registry
+        print(f"✅ Exported {index.export_from_collection(registry.collection(workspace))} chunks")
+    elif command == "train":
+        print(f"✅ Clustered into {index.train()} lists")
+    print(index.stats())
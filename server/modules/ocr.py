@@ -0,0 +1,116 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from config import OCR_WORKERS, OCR_DPI
+from modules.metrics import OCR_PAGE_LATENCY
+
+# Per-process state. In pool workers these are set up by _init_worker;
+# in the parent they are created lazily for small inline jobs.
+_engine = None
+_open_doc = None
+_open_key = None
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    global _engine
+    from rapidocr_onnxruntime import RapidOCR
+    _engine = RapidOCR()
+
+
+def _get_document(file_path):
+    # Keep the last PDF open so consecutive pages don't re-parse the file.
+    # Keyed on mtime and size too, since a re-upload replaces the file at the
+    # same path; opened from memory so no handle blocks that replace or a
+    # delete (Windows).
+    global _open_doc, _open_key
+    import fitz
+    st = os.stat(file_path)
+    key = (file_path, st.st_mtime_ns, st.st_size)
+    if _open_key != key:
+        if _open_doc is not None:
+            _open_doc.close()
+            _open_doc, _open_key = None, None
+        with open(file_path, "rb") as f:
+            _open_doc = fitz.open(stream=f.read(), filetype="pdf")
+        _open_key = key
+    return _open_doc
+
+
+def _ocr_page(file_path, page_num, dpi, doc=None):
+    """
+    Renders one page and recognises it. Runs inside a pool worker unless
+    `doc` is given. Returns (page_num, text, seconds spent).
+    """
+    import numpy as np
+
+    start = time.perf_counter()
+    if _engine is None:
+        _init_worker()
+    if doc is None:
+        doc = _get_document(file_path)
+    page = doc[page_num]
+    pix = page.get_pixmap(dpi=dpi, alpha=False)
+
+    # Hand the raw RGB samples to the engine; no PNG encode/decode round trip.
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    img = np.ascontiguousarray(img[:, :, ::-1])  # RGB -> BGR, as RapidOCR expects
+
+    result, _ = _engine(img)
+    text = "\n".join(line[1] for line in result) if result else ""
+    return page_num, text, time.perf_counter() - start
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process that already runs onnxruntime/uvicorn threads is unsafe
+                _pool = ProcessPoolExecutor(
+                    max_workers=OCR_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+    return _pool
+
+
+def ocr_pdf_pages(file_path, page_numbers=None, dpi=OCR_DPI):
+    """
+    OCRs the given pages (all pages by default) of a PDF and returns
+    [(page_num, text), ...] sorted by page number. Pages are rendered and
+    recognised in parallel across OCR_WORKERS processes.
+    """
+    import fitz
+
+    file_path = str(file_path)
+    if page_numbers is None:
+        with fitz.open(file_path) as doc:
+            page_numbers = list(range(doc.page_count))
+    if not page_numbers:
+        return []
+
+    if OCR_WORKERS <= 1 or len(page_numbers) == 1:
+        with fitz.open(file_path) as doc:
+            results = [_ocr_page(file_path, n, dpi, doc) for n in page_numbers]
+    else:
+        pool = _get_pool()
+        futures = [pool.submit(_ocr_page, file_path, n, dpi) for n in page_numbers]
+        results = [f.result() for f in futures]
+
+    for _, _, seconds in results:
+        OCR_PAGE_LATENCY.observe(seconds)
+    return sorted((page_num, text) for page_num, text, _ in results)
+
+
+def shutdown_ocr_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import (
+    EMBED_MODEL_NAME, EMBED_ONNX_DIR, EMBED_ONNX_QUANTIZE, EMBED_ONNX_THREADS, EMBED_ONNX_BATCH_SIZE
+)
+from logger import get_logger
+
+logger = get_logger("embed")
+
+# sentence-transformers truncates all-MiniLM-L6-v2 inputs at 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+_export_lock = threading.Lock()
+
+
+def hub_name(model_name):
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def model_dir(model_name=EMBED_MODEL_NAME, root=EMBED_ONNX_DIR):
+    return os.path.join(root, hub_name(model_name).replace("/", "__"))
+
+
+def export_onnx(model_name=EMBED_MODEL_NAME, root=EMBED_ONNX_DIR, quantize=EMBED_ONNX_QUANTIZE):
+    """
+    Exports the transformer behind a sentence-transformers model to ONNX
+    (model.onnx) next to its tokenizer, plus a dynamically int8-quantized
+    copy (model.int8.onnx) when `quantize` is set. Needs torch and
+    transformers, so it runs once; serving only needs onnxruntime.
+    """
+    out_dir = model_dir(model_name, root)
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    int8_path = os.path.join(out_dir, "model.int8.onnx")
+    with _export_lock:
+        if not os.path.exists(fp32_path):
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+
+            os.makedirs(out_dir, exist_ok=True)
+            tokenizer = AutoTokenizer.from_pretrained(hub_name(model_name))
+            model = AutoModel.from_pretrained(hub_name(model_name)).eval()
+            tokenizer.save_pretrained(out_dir)
+            sample = tokenizer(["warm up"], return_tensors="pt")
+            names = ["input_ids", "attention_mask", "token_type_ids"]
+            axes = {0: "batch", 1: "sequence"}
+            tmp_path = fp32_path + ".tmp"
+            with torch.no_grad():
+                torch.onnx.export(
+                    model,
+                    tuple(sample[n] for n in names),
+                    tmp_path,
+                    input_names=names,
+                    output_names=["last_hidden_state"],
+                    dynamic_axes={**{n: axes for n in names}, "last_hidden_state": axes},
+                    opset_version=14,
+                )
+            os.replace(tmp_path, fp32_path)
+            logger.info(f"exported {hub_name(model_name)} to {fp32_path}")
+
+        if quantize and not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            tmp_path = int8_path + ".tmp"
+            quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, int8_path)
+            logger.info(f"quantized {fp32_path} to int8")
+    return int8_path if quantize else fp32_path
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Drop-in replacement for HuggingFaceEmbeddings(all-MiniLM-L6-v2) that
+    runs the exported transformer in ONNX Runtime: tokenize, run, mean-pool
+    over the attention mask, L2-normalize, as the sentence-transformers
+    pipeline does. Texts are length-sorted into batches so short chunks
+    aren't padded to the longest one in the call.
+    """
+
+    def __init__(self, model_path, threads=EMBED_ONNX_THREADS, batch_size=EMBED_ONNX_BATCH_SIZE,
+                 max_length=MAX_SEQ_LENGTH):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(os.path.dirname(model_path), "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": mask,
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self._inputs})[0]
+        weights = mask[..., None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._encode_batch([texts[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text):
+        return self._encode_batch([text])[0].tolist()
+
+
+def load_onnx_embeddings(model_name=EMBED_MODEL_NAME, quantize=EMBED_ONNX_QUANTIZE):
+    """Exports on first use, then opens an ONNX Runtime session."""
+    return OnnxEmbeddings(export_onnx(model_name, quantize=quantize))
+
+
+if __name__ == "__main__":
+    # python -m modules.onnx_embeddings export
+    if sys.argv[1:] != ["export"]:
+        print("usage: python -m modules.onnx_embeddings export")
+        sys.exit(1)
+    print(f"✅ Exported to {export_onnx()}")
@@ -0,0 +1,52 @@
+from config import OCR_MIN_PAGE_CHARS
+from modules.ocr import ocr_pdf_pages
+from logger import get_logger
+
+# Per-page lines are DEBUG; enable with LOG_LEVELS="ragbot.ingest.ocr=DEBUG"
+logger = get_logger("ingest.ocr")
+
+
+def extract_pdf(file_path, min_chars=OCR_MIN_PAGE_CHARS):
+    """
+    Single-pass PDF extraction. Text is pulled per page with PyMuPDF; only
+    pages with fewer than `min_chars` characters that also carry images are
+    rasterized and sent to OCR, so mixed documents keep their scanned pages
+    and born-digital PDFs are opened exactly once.
+
+    Returns one Document per non-empty page with `source`, `page` (0-based,
+    like PyPDFLoader) and `extraction` ("text" or "ocr") metadata.
+    """
+    import fitz  # PyMuPDF
+    from langchain_core.documents import Document
+
+    source = str(file_path)
+    pages = {}
+    ocr_candidates = []
+
+    with fitz.open(source) as doc:
+        total_pages = doc.page_count
+        for page in doc:
+            text = page.get_text("text")
+            if len(text.strip()) >= min_chars:
+                pages[page.number] = (text, "text")
+            elif page.get_images(full=False):
+                ocr_candidates.append(page.number)
+            elif text.strip():
+                pages[page.number] = (text, "text")
+
+    if ocr_candidates:
+        logger.info(f"⚠️ {len(ocr_candidates)}/{total_pages} pages need OCR in {file_path}")
+        for page_num, text in ocr_pdf_pages(source, ocr_candidates):
+            if text.strip():
+                pages[page_num] = (text, "ocr")
+                logger.debug(f"   - Page {page_num+1}: OCR Success")
+            else:
+                logger.debug(f"   - Page {page_num+1}: No text found")
+
+    return [
+        Document(
+            page_content=text,
+            metadata={"source": source, "page": page_num, "total_pages": total_pages, "extraction": method}
+        )
+        for page_num, (text, method) in sorted(pages.items())
+    ]
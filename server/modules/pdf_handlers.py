@@ -1,17 +1,115 @@
 import os
-import shutil
-from fastapi import UploadFile
+import hashlib
 import tempfile
+from pathlib import Path
+from typing import NamedTuple
+from fastapi import UploadFile
+
+from config import UPLOAD_DIR, UPLOAD_CHUNK_SIZE, MAX_UPLOAD_FILE_BYTES, MAX_UPLOAD_REQUEST_BYTES
+
+
+class UploadTooLargeError(Exception):
+    """Raised when a file or the whole request exceeds the configured size limits."""
+
+
+class SavedUpload(NamedTuple):
+    path: Path
+    sha256: str
+    size: int
+
+
+class StagedUpload(NamedTuple):
+    """An upload streamed to a temp file next to `path`, not yet renamed into place."""
+    tmp_path: Path
+    path: Path
+    sha256: str
+    size: int
+
+
+def _stream_to_disk(src, dest_path, max_bytes, chunk_size=UPLOAD_CHUNK_SIZE):
+    """
+    Copies `src` into a temp file in `dest_path`'s directory in fixed-size
+    chunks, hashing as it goes. The file under the real name is not touched
+    until publish_uploads(), so a rejected request never clobbers an earlier
+    upload of the same name.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=dest_path.parent, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"{dest_path.name} exceeds the {max_bytes // (1024 * 1024)} MB limit")
+                hasher.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return StagedUpload(Path(tmp_path), dest_path, hasher.hexdigest(), size)
+
+
+def upload_name(file: UploadFile) -> str:
+    """The name an upload is saved under; basename() keeps client-supplied names from escaping upload_dir."""
+    return os.path.basename(file.filename)
+
+
+def stage_uploaded_files(files: list[UploadFile], upload_dir: str = UPLOAD_DIR) -> list[StagedUpload]:
+    """
+    Streams each upload into a temp file in `upload_dir`, enforcing
+    MAX_UPLOAD_FILE_BYTES per file and MAX_UPLOAD_REQUEST_BYTES across the
+    request. If any file is rejected, the temp files of this request are
+    removed again.
+    """
+    os.makedirs(upload_dir, exist_ok=True)
+    staged = []
+    remaining = MAX_UPLOAD_REQUEST_BYTES
+    try:
+        for file in files:
+            dest_path = Path(upload_dir) / upload_name(file)
+            if file.size is not None and file.size > MAX_UPLOAD_FILE_BYTES:
+                raise UploadTooLargeError(f"{dest_path.name} exceeds the {MAX_UPLOAD_FILE_BYTES // (1024 * 1024)} MB limit")
+            if file.size is not None and file.size > remaining:
+                raise UploadTooLargeError(f"Upload exceeds the {MAX_UPLOAD_REQUEST_BYTES // (1024 * 1024)} MB per-request limit")
+            limit = min(MAX_UPLOAD_FILE_BYTES, remaining)
+            try:
+                upload = _stream_to_disk(file.file, dest_path, limit)
+            except UploadTooLargeError:
+                if limit < MAX_UPLOAD_FILE_BYTES:
+                    raise UploadTooLargeError(f"Upload exceeds the {MAX_UPLOAD_REQUEST_BYTES // (1024 * 1024)} MB per-request limit")
+                raise
+            remaining -= upload.size
+            staged.append(upload)
+    except BaseException:
+        discard_uploads(staged)
+        raise
+    return staged
+
+
+def saved_uploads(staged: list[StagedUpload]) -> list[SavedUpload]:
+    """The records ingestion sees: final paths, valid once publish_uploads() has run."""
+    return [SavedUpload(s.path, s.sha256, s.size) for s in staged]
+
+
+def publish_uploads(staged: list[StagedUpload]):
+    """Renames staged files over their real names; call only once the request has been accepted."""
+    for upload in staged:
+        os.replace(upload.tmp_path, upload.path)
+
 
+def discard_uploads(staged: list[StagedUpload]):
+    for upload in staged:
+        if upload.tmp_path.exists():
+            os.remove(upload.tmp_path)
 
-UPLOAD_DIR="./uploaded_pdfs"
 
-def save_uploaded_files(files:list[UploadFile]) -> list[str] :
-    os.makedirs(UPLOAD_DIR,exist_ok=True)
-    file_paths=[]
-    for file in files:
-        temp_path=os.path.join(UPLOAD_DIR,file.filename)
-        with open(temp_path,"wb") as f:
-            shutil.copyfileobj(file.file,f)
-        file_paths.append(temp_path)
-    return file_paths
\ No newline at end of file
+def save_uploaded_files(files: list[UploadFile], upload_dir: str = UPLOAD_DIR) -> list[SavedUpload]:
+    """Stages the uploads and publishes them straight away, for callers with no admission step."""
+    staged = stage_uploaded_files(files, upload_dir)
+    publish_uploads(staged)
+    return saved_uploads(staged)
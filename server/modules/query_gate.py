@@ -0,0 +1,126 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from config import ASK_WORKERS, ASK_QUEUE_LIMIT, ASK_EMBED_CONCURRENCY, ASK_LLM_CONCURRENCY
+from logger import get_logger
+from modules.metrics import QUERY_ADMISSIONS
+
+logger = get_logger("query")
+
+
+class QueryOverloadedError(Exception):
+    """Raised when ASK_QUEUE_LIMIT questions are already waiting or running."""
+
+
+class QueryGate:
+    """
+    Runs the blocking part of answering a question (cache lookup,
+    embedding, vector search, LLM call) on a bounded thread pool, off the
+    event loop.
+
+    Identical questions that arrive while one is being answered share that
+    answer instead of running retrieval and the LLM again. Once
+    `queue_limit` admitted questions are unfinished, new ones are rejected
+    so clients back off instead of queueing without bound. Embedding and
+    LLM calls each have their own concurrency cap (`embed_slots`,
+    `llm_slots`), shared with the streaming endpoint.
+    """
+
+    def __init__(self, workers=ASK_WORKERS, queue_limit=ASK_QUEUE_LIMIT,
+                 embed_concurrency=ASK_EMBED_CONCURRENCY, llm_concurrency=ASK_LLM_CONCURRENCY):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.embed_slots = threading.BoundedSemaphore(embed_concurrency)
+        self.llm_slots = threading.BoundedSemaphore(llm_concurrency)
+        self.active = 0
+        self.admitted = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self._executor = None
+        self._inflight = {}  # key -> asyncio future; only touched on the event loop
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ask")
+        return self._executor
+
+    def has_capacity(self):
+        return self.active < self.queue_limit
+
+    def admit(self):
+        """Claims a slot or raises QueryOverloadedError. Pair with release()."""
+        with self._lock:
+            if self.active >= self.queue_limit:
+                self.rejected += 1
+                QUERY_ADMISSIONS.inc(outcome="rejected")
+                raise QueryOverloadedError(f"{self.active} questions already in progress")
+            self.active += 1
+            self.admitted += 1
+        QUERY_ADMISSIONS.inc(outcome="admitted")
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+    async def run(self, fn, *args, key=None):
+        """
+        Runs fn(*args) on the pool and awaits the result. A call made with
+        the same `key` while an earlier one is still running awaits that
+        call instead of starting another.
+        """
+        if key is not None and key in self._inflight:
+            self.coalesced += 1
+            QUERY_ADMISSIONS.inc(outcome="coalesced")
+            return await asyncio.shield(self._inflight[key])
+
+        self.admit()
+        loop = asyncio.get_running_loop()
+        # copy_context carries the request id into the worker thread's log lines
+        future = loop.run_in_executor(self._pool(), contextvars.copy_context().run, fn, *args)
+
+        def finished(f):
+            self.release()
+            if key is not None and self._inflight.get(key) is f:
+                del self._inflight[key]
+            if not f.cancelled():
+                f.exception()  # mark retrieved; every waiter may have disconnected
+
+        future.add_done_callback(finished)
+        if key is not None:
+            self._inflight[key] = future
+        # Shielded so a client disconnecting doesn't cancel work others are waiting on
+        return await asyncio.shield(future)
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "queue_limit": self.queue_limit,
+            "admitted": self.admitted,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+@contextmanager
+def limited(slots, timer, stage):
+    """Times the wait for a slot as `<stage>_wait`, then the stage itself."""
+    with timer.stage(f"{stage}_wait"):
+        slots.acquire()
+    try:
+        with timer.stage(stage):
+            yield
+    finally:
+        slots.release()
+
+
+query_gate = QueryGate()
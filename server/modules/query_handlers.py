@@ -1,17 +1,45 @@
-from logger import logger
+from logger import get_logger
 
+logger=get_logger("query")
 
 
+def source_list(docs):
+    return [doc.metadata.get("source","") for doc in docs]
+
 def query_chain(chain,user_input:str):
     try:
-        logger.debug(f"Running chain for input: {user_input}")
+        logger.debug("Running chain for input: %s",user_input)
         result=chain({"query":user_input})
         response={
             "response":result["result"],
-            "sources":[doc.metadata.get("source","") for doc in result["source_documents"]]
+            "sources":source_list(result["source_documents"])
         }
-        logger.debug(f"Chain response: {response}")
+        if "context" in result:
+            response["context"]=result["context"]
+        logger.debug("Chain response: %s",response)
         return response
     except Exception as e:
         logger.exception("Error in query_chain")
-        raise
\ No newline at end of file
+        raise
+
+def stream_query_chain(stream_chain,user_input:str):
+    """
+    Runs a streaming chain and yields (event, data) pairs: one "sources"
+    event, then "token" events, then "done" carrying the full response.
+    Errors are reported as a final "error" event since headers are already sent.
+    """
+    try:
+        logger.debug("Streaming chain for input: %s",user_input)
+        tokens=[]
+        sources=[]
+        for kind,payload in stream_chain(user_input):
+            if kind=="sources":
+                sources=source_list(payload)
+                yield "sources",{"sources":sources}
+            else:
+                tokens.append(payload)
+                yield "token",{"content":payload}
+        yield "done",{"response":"".join(tokens),"sources":sources}
+    except Exception:
+        logger.exception("Error in stream_query_chain")
+        yield "error",{"error":"Something went wrong. Please try again later.","code":"SERVER_ERROR"}
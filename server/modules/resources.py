@@ -0,0 +1,179 @@
+import threading
+import time
+
+from config import (
+    PERSIST_DIR, DEFAULT_WORKSPACE, EMBED_MODEL_NAME, LLM_MODEL_NAME, GROQ_API_KEY, EMBED_CACHE_ENABLED, LLM_BACKEND,
+    MMAP_INDEX_ENABLED, EMBED_BACKEND, EMBED_ONNX_QUANTIZE, HYBRID_SEARCH_ENABLED
+)
+from logger import logger
+from modules.workspaces import workspace_paths
+
+
+class ResourceRegistry:
+    """
+    Process-wide holder for the heavy objects every endpoint needs:
+    the embedding model, the Chroma collection handles and the LLM client.
+    Stores and sidecar indexes are kept per workspace.
+
+    Each resource is built once on first use (or by warm_up at startup)
+    and then shared, so requests never pay model load or client setup.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._embed_model = None
+        self._llm = None
+        self._vectorstores = {}
+        self._catalogs = {}
+        self._read_indexes = {}
+        self._lexical_indexes = {}
+        self.started_at = time.time()
+        self.timings = {}
+        self.ready = False
+        self.error = None
+
+    def _timed_build(self, name, build):
+        start = time.perf_counter()
+        resource = build()
+        self.timings[name] = round(time.perf_counter() - start, 3)
+        logger.info(f"{name} ready in {self.timings[name]}s")
+        return resource
+
+    def _per_workspace(self, resources, workspace, name, build):
+        """One `build(paths)` result per workspace, built on first use."""
+        if workspace not in resources:
+            with self._lock:
+                if workspace not in resources:
+                    if workspace != DEFAULT_WORKSPACE:
+                        name = f"{name}[{workspace}]"
+                    paths = workspace_paths(workspace)
+                    resources[workspace] = self._timed_build(name, lambda: build(paths))
+        return resources[workspace]
+
+    def embed_model(self):
+        if self._embed_model is None:
+            with self._lock:
+                if self._embed_model is None:
+                    def build():
+                        cache_name = EMBED_MODEL_NAME
+                        if EMBED_BACKEND == "onnx":
+                            from modules.onnx_embeddings import load_onnx_embeddings
+                            embed_model = load_onnx_embeddings()
+                            # int8 vectors differ slightly; don't mix them with full-precision cache entries
+                            if EMBED_ONNX_QUANTIZE:
+                                cache_name = f"{EMBED_MODEL_NAME}-int8"
+                        else:
+                            from langchain_huggingface import HuggingFaceEmbeddings
+                            embed_model = HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME)
+                        if EMBED_CACHE_ENABLED:
+                            from modules.embedding_cache import CachedEmbeddings
+                            embed_model = CachedEmbeddings(embed_model, cache_name)
+                        return embed_model
+                    self._embed_model = self._timed_build("embed_model_load", build)
+        return self._embed_model
+
+    def vectorstore(self, workspace=DEFAULT_WORKSPACE):
+        def build(paths):
+            from langchain_chroma import Chroma
+            return Chroma(
+                persist_directory=PERSIST_DIR,
+                embedding_function=self.embed_model(),
+                collection_name=paths.collection
+            )
+        return self._per_workspace(self._vectorstores, workspace, "vectorstore_open", build)
+
+    def collection(self, workspace=DEFAULT_WORKSPACE):
+        """Raw chromadb collection behind the workspace's vectorstore."""
+        return self.vectorstore(workspace)._collection
+
+    def catalog(self, workspace=DEFAULT_WORKSPACE):
+        def build(paths):
+            from modules.catalog import DocumentCatalog
+            return DocumentCatalog(paths.catalog)
+        return self._per_workspace(self._catalogs, workspace, "catalog_open", build)
+
+    def read_index(self, workspace=DEFAULT_WORKSPACE):
+        """Memory-mapped read-path index, or None unless MMAP_INDEX_ENABLED is set."""
+        if not MMAP_INDEX_ENABLED:
+            return None
+
+        def build(paths):
+            from modules.mmap_index import MmapVectorIndex
+            return MmapVectorIndex(paths.read_index)
+        return self._per_workspace(self._read_indexes, workspace, "read_index_open", build)
+
+    def lexical_index(self, workspace=DEFAULT_WORKSPACE):
+        """BM25 index over chunk text, or None unless HYBRID_SEARCH_ENABLED is set."""
+        if not HYBRID_SEARCH_ENABLED:
+            return None
+
+        def build(paths):
+            from modules.lexical_index import LexicalIndex
+            return LexicalIndex(paths.lexical_index)
+        return self._per_workspace(self._lexical_indexes, workspace, "lexical_index_open", build)
+
+    def llm(self):
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    def build():
+                        if LLM_BACKEND == "stub":
+                            from modules.stub_llm import StubStreamingLLM
+                            return StubStreamingLLM()
+                        if LLM_BACKEND == "langchain":
+                            from langchain_groq import ChatGroq
+                            return ChatGroq(
+                                groq_api_key=GROQ_API_KEY,
+                                model_name=LLM_MODEL_NAME
+                            )
+                        from modules.llm_client import PooledLLMClient
+                        return PooledLLMClient()
+                    self._llm = self._timed_build("llm_client_init", build)
+        return self._llm
+
+    def shutdown_llm(self):
+        """Closes the pooled LLM client's connections and hedging threads, if one was built."""
+        with self._lock:
+            llm, self._llm = self._llm, None
+        if llm is not None and hasattr(llm, "close"):
+            llm.close()
+
+    def warm_up(self):
+        """Builds every resource and runs one embedding so the first query is not cold."""
+        start = time.perf_counter()
+        try:
+            self.embed_model()
+            self.vectorstore()
+            # Bypass the embedding cache so the encoder itself runs once
+            encoder = getattr(self.embed_model(), "underlying", self.embed_model())
+            self._timed_build("embed_warmup", lambda: encoder.embed_query("warm up"))
+            try:
+                self.llm()
+            except Exception as e:
+                # The LLM client is only needed by /ask/; ingestion can still run.
+                logger.warning(f"LLM client init failed: {e}")
+            self.timings["warmup_total"] = round(time.perf_counter() - start, 3)
+            self.ready = True
+            logger.info(f"Resources warmed up in {self.timings['warmup_total']}s")
+        except Exception as e:
+            self.error = str(e)
+            logger.exception("Resource warm-up failed")
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "embed_model_loaded": self._embed_model is not None,
+            "embed_backend": EMBED_BACKEND,
+            "vectorstore_open": DEFAULT_WORKSPACE in self._vectorstores,
+            "workspaces_open": sorted(self._vectorstores),
+            "llm_client_ready": self._llm is not None,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "timings": dict(self.timings),
+            "embed_cache": self._embed_model.stats() if hasattr(self._embed_model, "stats") else None,
+            "read_index": {ws: index.stats() for ws, index in self._read_indexes.items()} or None,
+            "lexical_index": {ws: index.stats() for ws, index in self._lexical_indexes.items()} or None,
+            "error": self.error,
+        }
+
+
+registry = ResourceRegistry()
@@ -0,0 +1,105 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from config import DEFAULT_WORKSPACE, RETRIEVER_K, HYBRID_FETCH_K, WORKSPACE_FANOUT_WORKERS
+from logger import get_logger
+from modules.resources import registry
+from modules.mmap_index import MmapVectorStore
+from modules.lexical_index import HybridRetriever, reciprocal_rank_fusion, doc_key
+
+logger = get_logger("query")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=WORKSPACE_FANOUT_WORKERS, thread_name_prefix="fanout")
+    return _pool
+
+
+def shutdown_fanout_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def workspace_store(workspace):
+    # Memory-mapped read index when enabled, else the workspace's Chroma store
+    # (either way the embedder is loaded once per process)
+    read_index = registry.read_index(workspace)
+    if read_index is None:
+        return registry.vectorstore(workspace)
+    return MmapVectorStore(read_index, registry.embed_model())
+
+
+class ShardedRetriever:
+    """
+    Answers one question from several workspaces. Each workspace is
+    searched on the fan-out pool at the same time. The vector hits of all
+    workspaces are merged by distance (one embedder, so distances compare).
+    BM25 scores do not compare across indexes, since each computes IDF over
+    its own corpus, so every workspace's BM25 list is fused by rank
+    instead. The result is the top-k over the union rather than k per
+    workspace.
+    """
+
+    def __init__(self, workspaces, k=RETRIEVER_K, fetch_k=HYBRID_FETCH_K):
+        self.shards = [(ws, workspace_store(ws), registry.lexical_index(ws)) for ws in workspaces]
+        # modules.llm.retrieve embeds the question with this store's embedder
+        self.vectorstore = self.shards[0][1]
+        self.search_kwargs = {"k": k}
+        self.fetch_k = fetch_k
+
+    def _search_shard(self, shard, question, vector, fetch_k):
+        from langchain_core.documents import Document
+
+        workspace, store, lexical = shard
+        dense = store.similarity_search_by_vector_with_relevance_scores(vector, k=fetch_k)
+        sparse = lexical.search(question, fetch_k) if lexical is not None else []
+        for doc, _ in dense:
+            doc.metadata["workspace"] = workspace
+        return dense, [Document(page_content=text, metadata=dict(meta, workspace=workspace)) for _, text, meta, _ in sparse]
+
+    def search(self, question, vector, timer=None):
+        stage = timer.stage if timer is not None else lambda name: nullcontext()
+        k = self.search_kwargs["k"]
+        hybrid = any(lexical is not None for _, _, lexical in self.shards)
+        fetch_k = max(k, self.fetch_k) if hybrid else k
+        with stage("search"):
+            results = list(_get_pool().map(
+                lambda shard: self._search_shard(shard, question, vector, fetch_k), self.shards
+            ))
+        with stage("fuse"):
+            dense = sorted((hit for shard_dense, _ in results for hit in shard_dense), key=lambda hit: hit[1])
+            dense = [doc for doc, _ in dense[:fetch_k]]
+            if not hybrid:
+                return dense[:k]
+            sparse = [[(doc_key(d), d) for d in shard_sparse] for _, shard_sparse in results if shard_sparse]
+            return reciprocal_rank_fusion([[(doc_key(d), d) for d in dense]] + sparse, k)
+
+    def invoke(self, question):
+        return self.search(question, self.vectorstore.embeddings.embed_query(question))
+
+
+def get_retriever(workspaces=(DEFAULT_WORKSPACE,)):
+    """Retriever over one workspace, or a fan-out retriever over several."""
+    if len(workspaces) > 1:
+        return ShardedRetriever(workspaces)
+    workspace = workspaces[0]
+    store = workspace_store(workspace)
+    # Fused with BM25 so exact identifiers are found without raising k
+    lexical_index = registry.lexical_index(workspace)
+    if lexical_index is not None:
+        return HybridRetriever(store, lexical_index, k=RETRIEVER_K)
+    return store.as_retriever(
+        search_type="similarity",
+        search_kwargs={"k": RETRIEVER_K}
+    )
@@ -0,0 +1,95 @@
+import datetime
+
+from config import SHEET_ROWS_PER_DOC
+
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return " ".join(str(value).split())
+
+
+def _xlsx_sheets(file_path):
+    """Yields (sheet_name, row_iterator) using openpyxl's streaming read-only mode."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            yield ws.title, ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _xls_sheets(file_path):
+    """Legacy .xls has no streaming reader; fall back to pandas one sheet at a time."""
+    import pandas as pd
+
+    with pd.ExcelFile(file_path) as xls:
+        for name in xls.sheet_names:
+            df = xls.parse(name, header=None)
+            yield name, (tuple(None if pd.isna(v) else v for v in row) for row in df.itertuples(index=False))
+
+
+def extract_spreadsheet(file_path, rows_per_doc=SHEET_ROWS_PER_DOC, max_length=None):
+    """
+    Streams every sheet of a workbook and yields one Document per group of
+    at most `rows_per_doc` rows. A group also ends before it would exceed
+    `max_length` (default: the chunk size, in the splitter's units), so
+    each group is a single chunk and every chunk starts with the sheet's
+    column headers. Documents carry `sheet`, `row_start` and `row_end`
+    (1-based spreadsheet row numbers) in their metadata. Rows are never
+    materialized as a whole sheet, so memory stays flat.
+    """
+    from langchain_core.documents import Document
+    from modules.chunking import chunk_length, chunk_budget
+
+    max_length = max_length or chunk_budget()
+
+    source = str(file_path)
+    sheets = _xls_sheets(file_path) if str(file_path).lower().endswith(".xls") else _xlsx_sheets(file_path)
+
+    for sheet_index, (sheet_name, rows) in enumerate(sheets):
+        header = None
+        group, group_start, group_length, prefix_length = [], None, 0, 0
+
+        def flush(row_end):
+            return Document(
+                page_content=f"Sheet: {sheet_name} (rows {group_start}-{row_end})\n"
+                             + " | ".join(header) + "\n" + "\n".join(group),
+                metadata={"source": source, "sheet": sheet_name, "page": sheet_index,
+                          "row_start": group_start, "row_end": row_end}
+            )
+
+        last_row = 0
+        for row_num, row in enumerate(rows, start=1):
+            cells = [_cell_text(v) for v in row]
+            while cells and not cells[-1]:
+                cells.pop()
+            if not cells:
+                continue
+            if header is None:
+                header = [c or f"Column {i + 1}" for i, c in enumerate(cells)]
+                # Title with a worst-case row range, plus the header line
+                prefix_length = chunk_length(f"Sheet: {sheet_name} (rows 9999999-9999999)\n" + " | ".join(header))
+                continue
+            line = " | ".join(cells)
+            line_length = chunk_length(line)
+            if group and prefix_length + group_length + line_length > max_length:
+                yield flush(last_row)
+                group, group_start, group_length = [], None, 0
+            if group_start is None:
+                group_start = row_num
+            group.append(line)
+            group_length += line_length + 1
+            last_row = row_num
+            if len(group) >= rows_per_doc:
+                yield flush(last_row)
+                group, group_start, group_length = [], None, 0
+
+        if group:
+            yield flush(last_row)
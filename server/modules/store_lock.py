@@ -0,0 +1,35 @@
+import os
+import sys
+
+from config import STORE_LOCK_PATH
+
+
+class StoreLockedError(RuntimeError):
+    """Raised when another process holds the store lock in a conflicting mode."""
+
+
+def lock_store(exclusive, path=STORE_LOCK_PATH):
+    """
+    Locks the persistent store for this process and returns the open lock
+    file; the lock lasts until it is closed or the process exits (the OS
+    drops it after a crash too). API server processes take it shared, so
+    several uvicorn workers coexist. bulk_ingest.py takes it exclusively:
+    Chroma's PersistentClient is not safe across processes, and a running
+    server would neither see the new vectors nor drop its cached answers.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handle = open(path, "a+")
+    try:
+        if sys.platform == "win32":
+            import msvcrt
+            # No shared locks on Windows: one process holds the store at a time
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(handle.fileno(), (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        holder = "the API server or bulk ingestion" if exclusive else "bulk ingestion"
+        raise StoreLockedError(f"The store at {os.path.dirname(path) or '.'} is in use by {holder}.")
+    return handle
@@ -0,0 +1,29 @@
+import time
+from types import SimpleNamespace
+
+from config import STUB_LLM_TOKEN_DELAY
+
+
+class StubStreamingLLM:
+    """
+    Offline stand-in for ChatGroq (LLM_BACKEND=stub). It answers with a
+    canned reply that echoes the question and streams it word by word,
+    sleeping `token_delay` seconds between words, so the streaming path
+    and the Streamlit client can be exercised without network or API key.
+    """
+
+    def __init__(self, token_delay=STUB_LLM_TOKEN_DELAY):
+        self.token_delay = token_delay
+
+    def _answer(self, prompt):
+        question = prompt.split("**User Question:**", 1)[-1].split("---", 1)[0].strip()
+        return f"This is a stub answer to: {question}"
+
+    def invoke(self, prompt):
+        return SimpleNamespace(content=self._answer(prompt))
+
+    def stream(self, prompt):
+        words = self._answer(prompt).split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.token_delay)
+            yield SimpleNamespace(content=word if i == 0 else " " + word)
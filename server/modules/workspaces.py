@@ -0,0 +1,120 @@
+import os
+import re
+from typing import NamedTuple
+
+from config import (
+    DEFAULT_WORKSPACE, WORKSPACES_DIR, COLLECTION_NAME, UPLOAD_DIR, CATALOG_PATH, LEXICAL_INDEX_PATH, MMAP_INDEX_DIR
+)
+
+# Lowercase slugs; short enough that "rag_app-<name>" stays a valid Chroma collection name
+WORKSPACE_PATTERN = re.compile(r"[a-z0-9][a-z0-9_-]{0,31}")
+# /ask/ workspace value that searches every workspace
+ALL_WORKSPACES = "*"
+
+
+class InvalidWorkspaceError(ValueError):
+    """Raised for a workspace name that is not a short lowercase slug."""
+
+
+class WorkspacePaths(NamedTuple):
+    collection: str
+    upload_dir: str
+    catalog: str
+    lexical_index: str
+    read_index: str
+
+
+def normalize_workspace(name):
+    """Validated workspace name; empty means the default workspace."""
+    name = (name or "").strip().lower() or DEFAULT_WORKSPACE
+    if not WORKSPACE_PATTERN.fullmatch(name):
+        raise InvalidWorkspaceError(
+            f"Invalid workspace '{name}'. Use up to 32 lowercase letters, digits, '-' or '_'."
+        )
+    return name
+
+
+def workspace_paths(name):
+    """Collection name and sidecar locations; the default workspace keeps the pre-workspace layout."""
+    if name == DEFAULT_WORKSPACE:
+        return WorkspacePaths(COLLECTION_NAME, UPLOAD_DIR, CATALOG_PATH, LEXICAL_INDEX_PATH, MMAP_INDEX_DIR)
+    root = os.path.join(WORKSPACES_DIR, name)
+    return WorkspacePaths(
+        f"{COLLECTION_NAME}-{name}",
+        os.path.join(root, "uploads"),
+        os.path.join(root, "catalog.sqlite3"),
+        os.path.join(root, "lexical_index.sqlite3"),
+        os.path.join(root, "mmap_index"),
+    )
+
+
+def create_workspace(name):
+    """Creates the workspace's directories; uploading to a new name calls this."""
+    os.makedirs(workspace_paths(name).upload_dir, exist_ok=True)
+
+
+def workspace_exists(name):
+    return name == DEFAULT_WORKSPACE or os.path.isdir(os.path.join(WORKSPACES_DIR, name))
+
+
+def list_workspaces():
+    names = []
+    if os.path.isdir(WORKSPACES_DIR):
+        names = sorted(
+            n for n in os.listdir(WORKSPACES_DIR)
+            if n != DEFAULT_WORKSPACE and WORKSPACE_PATTERN.fullmatch(n) and os.path.isdir(os.path.join(WORKSPACES_DIR, n))
+        )
+    return [DEFAULT_WORKSPACE] + names
+
+
+def resolve_workspaces(value):
+    """
+    Workspaces a question should search: one name, a comma-separated
+    list, or "*" for all of them. Returns names in request order.
+    """
+    value = (value or "").strip()
+    if value == ALL_WORKSPACES:
+        return list_workspaces()
+    names = [normalize_workspace(part) for part in value.split(",") if part.strip()]
+    return list(dict.fromkeys(names)) or [DEFAULT_WORKSPACE]
+
+
+def _disk_usage(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def _sqlite_usage(path):
+    return sum(_disk_usage(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+
+def workspace_stats(name):
+    """Document and chunk counts plus on-disk index size for one workspace."""
+    from modules.resources import registry
+
+    paths = workspace_paths(name)
+    collection = registry.collection(name)
+    chunks = collection.count()
+    dim = 0
+    if chunks:
+        sample = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        dim = len(sample[0]) if len(sample) else 0
+    index_bytes = {
+        # Chroma keeps every collection in one store; float32 vectors are the per-collection bulk
+        "vectors_estimate": chunks * dim * 4,
+        "catalog": _sqlite_usage(paths.catalog),
+        "lexical_index": _sqlite_usage(paths.lexical_index),
+        "read_index": _disk_usage(paths.read_index) if os.path.isdir(paths.read_index) else 0,
+    }
+    return {
+        "workspace": name,
+        "collection": paths.collection,
+        "documents": len(registry.catalog(name).list_documents()),
+        "chunks": chunks,
+        "index_bytes": {**index_bytes, "total": sum(index_bytes.values())},
+        "upload_bytes": _disk_usage(paths.upload_dir) if os.path.isdir(paths.upload_dir) else 0,
+    }
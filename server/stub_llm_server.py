@@ -0,0 +1,111 @@
+"""
+Local OpenAI/Groq-compatible chat completions server for exercising the
+pooled LLM client (modules/llm_client.py) without network or API key.
+Latency, slow-tail requests and error responses can be injected per run,
+and per model, so hedging and fallback can be watched in /metrics.
+
+    python stub_llm_server.py --port 8100 --latency 0.3 --slow-rate 0.1 --slow-latency 8 --error-rate 0.05
+    python stub_llm_server.py --model-latency llama-3.3-70b-versatile=20   # force fallbacks
+
+    # then start the API against it
+    LLM_API_BASE=http://127.0.0.1:8100/openai/v1 uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from modules.stub_llm import StubStreamingLLM
+
+app = FastAPI(title="Stub LLM")
+settings = argparse.Namespace()
+stats = Counter()
+answers = StubStreamingLLM(token_delay=0)
+
+
+def plan(model):
+    """Returns (delay before the answer starts, error status or None) for one request."""
+    delay = settings.model_latency.get(model, settings.latency)
+    if random.random() < settings.slow_rate:
+        delay += settings.slow_latency
+    error = settings.error_status if random.random() < settings.error_rate else None
+    return delay, error
+
+
+def completion(model, content):
+    return {
+        "id": f"stub-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+
+def chunk(model, content, finish=None):
+    return {
+        "object": "chat.completion.chunk",
+        "model": model,
+        "choices": [{"index": 0, "delta": {"content": content} if content else {}, "finish_reason": finish}],
+    }
+
+
+@app.post("/openai/v1/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    prompt = body["messages"][-1]["content"]
+    delay, error = plan(model)
+    await asyncio.sleep(delay)
+    if error is not None:
+        stats[f"{model} error"] += 1
+        return JSONResponse(status_code=error, content={"error": {"message": "injected failure", "type": "server_error"}})
+    stats[f"{model} ok"] += 1
+
+    text = answers._answer(prompt)
+    if not body.get("stream"):
+        return completion(model, text)
+
+    async def events():
+        for i, word in enumerate(text.split(" ")):
+            yield f"data: {json.dumps(chunk(model, word if i == 0 else ' ' + word))}\n\n"
+            await asyncio.sleep(settings.token_delay)
+        yield f"data: {json.dumps(chunk(model, None, 'stop'))}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def get_stats():
+    return dict(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each answer starts")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="override --latency for one model (repeatable)")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of requests given --slow-latency extra")
+    parser.add_argument("--slow-latency", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--token-delay", type=float, default=0.02, help="seconds between streamed words")
+    args = parser.parse_args()
+    args.model_latency = {k: float(v) for k, v in (spec.split("=", 1) for spec in args.model_latency)}
+    vars(settings).update(vars(args))
+    print(f"🧪 Stub LLM on http://{args.host}:{args.port}/openai/v1")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
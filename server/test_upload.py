@@ -1,3 +1,4 @@
+import time
 import requests
 from PIL import Image, ImageDraw, ImageFont
 import io
@@ -23,8 +24,24 @@ try:
     print(f"CODE: {response.status_code}")
     print(f"RESPONSE: {response.text}")
     
-    if response.status_code == 200:
-        print("✅ SUCCESS: Backend is working and accepting uploads.")
+    if response.status_code == 202:
+        # Ingestion runs as a background job; poll it until it finishes
+        job_url = f"http://127.0.0.1:8000/jobs/{response.json()['job_id']}"
+        job = {}
+        for _ in range(120):
+            job_response = requests.get(job_url)
+            if job_response.status_code == 404:
+                job = {"status": "failed", "error": "job not found"}
+                break
+            job = job_response.json()
+            if job.get("status") in ("completed", "failed"):
+                break
+            time.sleep(1)
+        print(f"JOB: {job}")
+        if job.get("status") == "completed":
+            print("✅ SUCCESS: Backend is working and accepting uploads.")
+        else:
+            print(f"❌ FAIL: Ingestion job did not complete ({job.get('status', 'timed out')}).")
     else:
         print("❌ FAIL: Backend returned error.")
 
@@ -0,0 +1,84 @@
+"""
+Parity check for the ONNX embedding backend (modules/onnx_embeddings.py)
+against the PyTorch sentence-transformers model it replaces: per-text
+cosine similarity of the two vectors, and how many of the top-k
+neighbours both backends retrieve for the same questions.
+
+    python verify_onnx_embeddings.py            # fp32 and int8
+    python verify_onnx_embeddings.py --min-int8 0.97
+"""
+import argparse
+import random
+import sys
+
+import numpy as np
+from langchain_huggingface import HuggingFaceEmbeddings
+
+from config import EMBED_MODEL_NAME
+from modules.onnx_embeddings import OnnxEmbeddings, export_onnx
+
+WORDS = (
+    "invoice customer account delivery quarter auditor ledger balance payment reference contract "
+    "clause warranty shipment supplier order total tax region manager report candidate experience "
+    "python engineer university degree salary address email phone résumé naïve café 東京 данные"
+).split()
+
+QUESTIONS = [
+    "What is the candidate's email?",
+    "Which supplier handled the shipment?",
+    "What was the total tax for the quarter?",
+    "Summarize the warranty clause",
+    "Who is the regional manager?",
+]
+
+
+def make_texts(n, seed=3):
+    rng = random.Random(seed)
+    texts = ["", "a", "Payment due.", "   spaced   out   text   "]
+    while len(texts) < n:
+        # Mix of short chunks and ones long enough to hit the 256 word-piece truncation
+        length = rng.choice([5, 20, 60, 150, 400])
+        texts.append(" ".join(rng.choice(WORDS) for _ in range(length)))
+    return texts
+
+
+def check(name, reference, candidate, texts, k, min_cosine):
+    ref = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    got = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    cosine = np.sum(ref * got, axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(got, axis=1))
+
+    overlap = []
+    for question in QUESTIONS:
+        ref_top = np.argsort(-(ref @ np.asarray(reference.embed_query(question))))[:k]
+        got_top = np.argsort(-(got @ np.asarray(candidate.embed_query(question))))[:k]
+        overlap.append(len(set(ref_top) & set(got_top)) / k)
+
+    ok = cosine.min() >= min_cosine
+    print(
+        f"{'✅' if ok else '❌'} {name:<6} cosine min {cosine.min():.5f}  mean {cosine.mean():.5f}  "
+        f"top-{k} overlap {np.mean(overlap):.2f}  (required min cosine {min_cosine})"
+    )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=200)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--min-fp32", type=float, default=0.999)
+    parser.add_argument("--min-int8", type=float, default=0.98)
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+    reference = HuggingFaceEmbeddings(model_name=EMBED_MODEL_NAME)
+    print(f"📄 {len(texts)} texts, {EMBED_MODEL_NAME}: PyTorch vs ONNX Runtime")
+
+    results = [
+        check("fp32", reference, OnnxEmbeddings(export_onnx(quantize=False)), texts, args.k, args.min_fp32),
+        check("int8", reference, OnnxEmbeddings(export_onnx(quantize=True)), texts, args.k, args.min_int8),
+    ]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()